@@ -5,15 +5,34 @@ Generates and validates JWT tokens for secure access with database-backed user a
 """
 
 import secrets
+import time
 from datetime import datetime, timedelta
-from functools import wraps
+from functools import lru_cache, wraps
 
 import bcrypt
 import jwt
-from flask import jsonify, request
+from flask import g, jsonify, request
 
 from models import User, db
 
+# Decoded tokens are reused for this long before the signature is checked again
+TOKEN_CACHE_TTL_SECONDS = 60
+TOKEN_CACHE_MAX_ENTRIES = 10000
+
+# Failed logins per (email, remote address) tolerated before attempts are
+# rejected outright, without spending a bcrypt round on them. The counts live
+# in process memory, so under gunicorn each worker keeps its own: a client
+# spread across workers gets up to LOGIN_MAX_FAILURES * WSGI_WORKERS attempts.
+LOGIN_MAX_FAILURES = 5
+LOGIN_FAILURE_WINDOW_SECONDS = 300
+LOGIN_FAILURE_MAX_ENTRIES = 10000
+
+
+@lru_cache(maxsize=1)
+def _dummy_password_hash():
+    """bcrypt hash of a random password, made once per process for unknown-email logins."""
+    return bcrypt.hashpw(secrets.token_urlsafe(16).encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+
 
 class TokenAuth:
     """Handle JWT token generation and validation with database-backed authentication."""
@@ -37,6 +56,19 @@ class TokenAuth:
         # Format: {token_id: {'token': str, 'created': datetime, 'expires': datetime}}
         self.active_guest_tokens = {}
 
+        # Recently validated tokens, so repeat requests skip the HMAC check
+        # Format: {token: (payload or None, monotonic time the entry expires)}
+        self._validated_tokens = {}
+
+        # Recent failed logins for throttling
+        # Format: {(email, remote_addr): [failure count, monotonic time the window ends]}
+        self._failed_logins = {}
+
+        # Hash checked against when the email is unknown, so the response time
+        # does not reveal whether an account exists. Made up front: hashing it
+        # on the first unknown email would make that probe take twice as long.
+        self._dummy_password_hash = _dummy_password_hash()
+
     def hash_password(self, password):
         """
         Hash password using bcrypt.
@@ -78,6 +110,7 @@ class TokenAuth:
         """
         user = User.query.filter_by(email=email).first()
         if not user:
+            self.verify_password(password, self._dummy_password_hash)
             return None
 
         if not self.verify_password(password, user.password_hash):
@@ -89,6 +122,53 @@ class TokenAuth:
 
         return user
 
+    def login_throttled(self, email, remote_addr):
+        """
+        Check whether login attempts for an email/address pair are throttled.
+
+        Args:
+            email: Email the attempt is for
+            remote_addr: Client address (request.remote_addr; the forwarded client behind nginx)
+
+        Returns:
+            True if too many recent attempts failed, False otherwise
+        """
+        entry = self._failed_logins.get((email, remote_addr))
+        if entry is None:
+            return False
+        if entry[1] <= time.monotonic():
+            self._failed_logins.pop((email, remote_addr), None)
+            return False
+        return entry[0] >= LOGIN_MAX_FAILURES
+
+    def record_login_failure(self, email, remote_addr):
+        """
+        Count a failed login attempt towards the throttle.
+
+        Args:
+            email: Email the attempt was for
+            remote_addr: Client address
+        """
+        key = (email, remote_addr)
+        now = time.monotonic()
+        entry = self._failed_logins.get(key)
+        if entry is None or entry[1] <= now:
+            if len(self._failed_logins) >= LOGIN_FAILURE_MAX_ENTRIES:
+                self._failed_logins.clear()
+            self._failed_logins[key] = [1, now + LOGIN_FAILURE_WINDOW_SECONDS]
+        else:
+            entry[0] += 1
+
+    def reset_login_failures(self, email, remote_addr):
+        """
+        Forget failed attempts after a successful login.
+
+        Args:
+            email: Email that logged in
+            remote_addr: Client address
+        """
+        self._failed_logins.pop((email, remote_addr), None)
+
     def validate_admin_pin(self, pin):
         """
         Validate admin PIN (for first-time login only).
@@ -227,6 +307,8 @@ class TokenAuth:
     def require_admin(self):
         """
         Decorator to require admin authentication for Flask routes.
+
+        The authenticated admin ``User`` is stored on ``flask.g.admin_user``.
         """
 
         def decorator(f):
@@ -241,6 +323,8 @@ class TokenAuth:
                 if not user or user.role != "admin":
                     return jsonify({"error": "Admin access required", "code": "ADMIN_ACCESS_REQUIRED"}), 403
 
+                # Views reuse the resolved admin instead of decoding the token again
+                g.admin_user = user
                 return f(*args, **kwargs)
 
             return decorated_function
@@ -282,13 +366,27 @@ class TokenAuth:
         Returns:
             Decoded payload dict if valid, None if invalid
         """
+        now = time.monotonic()
+        cached = self._validated_tokens.get(token)
+        if cached is not None and cached[1] > now:
+            return cached[0]
+
         try:
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            return payload
         except jwt.ExpiredSignatureError:
-            return None
+            payload = None
         except jwt.InvalidTokenError:
-            return None
+            payload = None
+
+        # Never cache a token past its own expiry
+        cache_until = now + TOKEN_CACHE_TTL_SECONDS
+        if payload and "exp" in payload:
+            cache_until = min(cache_until, now + payload["exp"] - time.time())
+
+        if len(self._validated_tokens) >= TOKEN_CACHE_MAX_ENTRIES:
+            self._validated_tokens.clear()
+        self._validated_tokens[token] = (payload, cache_until)
+        return payload
 
     def require_auth(self, permission=None):
         """
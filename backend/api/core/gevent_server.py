@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+TerraCrate API v2 - gevent entry point.
+
+gevent must patch the standard library before socket, ssl or threading are
+imported anywhere, so this module patches first and only then loads the
+server. Start with ``python -m core.gevent_server``; with WSGI_SERVER=gunicorn
+this runs gunicorn with gevent workers, otherwise gevent's own WSGIServer.
+"""
+
+from gevent import monkey
+
+monkey.patch_all()
+
+from core import server  # noqa: E402
+
+if __name__ == "__main__":
+    if server.CONFIG["WSGI_SERVER"] == "gunicorn":
+        server.CONFIG["WSGI_WORKER_CLASS"] = "gevent"
+    else:
+        server.CONFIG["WSGI_SERVER"] = "gevent"
+    server.main()
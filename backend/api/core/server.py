@@ -4,16 +4,36 @@ TerraCrate API v2 - Main Server
 Ad-hoc file sharing server with web interface.
 """
 
+import contextlib
+import functools
+import html
+import io
+import json
+import mimetypes
 import os
+import re
+import shutil
 import socket
 import ssl
+import stat
 import sys
-from datetime import datetime, timedelta
+import time
+import unicodedata
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
+from string import Template
+from urllib.parse import quote, unquote
 
-from flask import Flask, jsonify, redirect, render_template, request, send_file
+from flask import Flask, g, jsonify, render_template, request, send_file, stream_template
 from flask_cors import CORS
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from sqlalchemy.pool import NullPool
+from werkzeug.http import is_resource_modified
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.serving import run_simple
+from werkzeug.urls import iri_to_uri
 from werkzeug.utils import secure_filename
 
 # Local imports
@@ -34,8 +54,7 @@ from models import (
 from utils.audit import log_audit
 from utils.email_sender import send_approval_email, send_invite_email, send_revocation_email
 from utils.generate_certs import generate_client_p12, generate_crl, update_crl_file
-from utils.mdns_advertiser import MDNSAdvertiser
-from utils.qr_generator import QRGenerator
+from utils.net import lan_ipv4
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 TEMPLATE_DIR = BASE_DIR / "templates"
@@ -57,6 +76,20 @@ CONFIG = {
     "ADMIN_PIN": os.getenv("ADMIN_PIN"),  # Must be set via environment
     "DATABASE_URI": os.getenv("DATABASE_URI", f"sqlite:///{BASE_DIR}/data/terracrate.db"),
     "CORS_ORIGINS": os.getenv("CORS_ORIGINS", "*"),  # Comma-separated origins or '*'
+    # Hand file bodies to the reverse proxy via X-Accel-Redirect instead of streaming them from Python
+    "USE_X_ACCEL": os.getenv("USE_X_ACCEL", "false").lower() == "true",
+    "X_ACCEL_PREFIX": os.getenv("X_ACCEL_PREFIX", "/_storage/"),  # nginx internal location aliased to STORAGE_PATH
+    # Emit X-Sendfile from every send_file() call (Apache mod_xsendfile, lighttpd)
+    "USE_X_SENDFILE": os.getenv("USE_X_SENDFILE", "false").lower() == "true",
+    # Set to false when a local reverse proxy terminates TLS and forwards plain HTTP (bind HOST to 127.0.0.1)
+    "SERVE_TLS": os.getenv("SERVE_TLS", "true").lower() == "true",
+    "WSGI_SERVER": os.getenv("WSGI_SERVER", "werkzeug").lower(),  # 'werkzeug' (development), 'gunicorn' or 'gevent'
+    "WSGI_WORKERS": int(os.getenv("WSGI_WORKERS", os.cpu_count() or 1)),
+    "WSGI_WORKER_CLASS": os.getenv("WSGI_WORKER_CLASS", "gthread").lower(),  # gunicorn worker: 'gthread' or 'gevent'
+    "WSGI_THREADS": int(os.getenv("WSGI_THREADS", 16)),
+    "GEVENT_POOL_SIZE": int(os.getenv("GEVENT_POOL_SIZE", 1000)),  # Max concurrent greenlets (per gevent worker)
+    # Peers whose X-Forwarded-For is believed (nginx proxies /api/ from loopback)
+    "TRUSTED_PROXIES": os.getenv("TRUSTED_PROXIES", "127.0.0.1,::1"),
 }
 
 # Initialize Flask app with explicit template folder
@@ -64,6 +97,38 @@ app = Flask(__name__, template_folder=str(TEMPLATE_DIR), static_folder=str(STATI
 app.config["MAX_CONTENT_LENGTH"] = CONFIG["MAX_UPLOAD_SIZE"]
 app.config["SQLALCHEMY_DATABASE_URI"] = CONFIG["DATABASE_URI"]
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+app.config["USE_X_SENDFILE"] = CONFIG["USE_X_SENDFILE"]
+# Emit keys in to_dict() order; sorting every nested dict is wasted work on list responses
+app.json.sort_keys = False
+if CONFIG["DATABASE_URI"].startswith("sqlite:///") and ":memory:" not in CONFIG["DATABASE_URI"]:
+    # Open a connection per checkout so SQLite's file lock is released as soon
+    # as the session closes; connections are cheap for a local file.
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "poolclass": NullPool,
+        "connect_args": {"check_same_thread": False, "timeout": 30},
+    }
+
+
+def _trust_forwarded_for(wsgi_app, proxies):
+    """
+    Take the client address from X-Forwarded-For, but only for requests from a trusted proxy.
+
+    The backend also listens on the LAN, so a header from any other peer
+    could be forged to dodge the per-address login throttle.
+    """
+    proxied_app = ProxyFix(wsgi_app, x_for=1)
+
+    def middleware(environ, start_response):
+        if environ.get("REMOTE_ADDR") in proxies:
+            return proxied_app(environ, start_response)
+        return wsgi_app(environ, start_response)
+
+    return middleware
+
+
+app.wsgi_app = _trust_forwarded_for(
+    app.wsgi_app, frozenset(addr.strip() for addr in CONFIG["TRUSTED_PROXIES"].split(",") if addr.strip())
+)
 
 # Configure CORS
 cors_origins = CONFIG["CORS_ORIGINS"]
@@ -76,6 +141,28 @@ else:
 # Initialize database
 db.init_app(app)
 
+
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    """Use NORMAL sync on each new connection; under WAL, commits then skip the full fsync."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def _configure_sqlite_engine(engine):
+    """
+    Put a SQLite engine's database in WAL mode and hook NORMAL sync onto its connections.
+
+    journal_mode=WAL is stored in the database file, so it is set once here
+    rather than on every NullPool connection; synchronous is per connection.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    event.listen(engine, "connect", _configure_sqlite_connection)
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+
+
 # Validate ADMIN_PIN is set
 if not CONFIG["ADMIN_PIN"]:
     print("ERROR: ADMIN_PIN environment variable is not set!")
@@ -92,24 +179,91 @@ os.makedirs(CONFIG["STORAGE_PATH"], exist_ok=True)
 os.makedirs(os.path.join(CONFIG["STORAGE_PATH"], "files", "guest"), exist_ok=True)
 
 
+@functools.lru_cache(maxsize=1)
 def get_server_url():
-    """Get the server's access URL."""
+    """Get the server's access URL (resolved once per process)."""
     hostname = CONFIG["MDNS_HOSTNAME"]
     # Remove .local suffix if already present to avoid double .local
     if hostname.endswith(".local"):
         hostname = hostname[:-6]
 
-    # Try to get actual IP address for better compatibility
-    try:
-        # Get local IP that's not loopback
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
-        local_ip = s.getsockname()[0]
-        s.close()
+    # Prefer the LAN IP for better compatibility, falling back to the hostname
+    local_ip = lan_ipv4()
+    if local_ip:
         return f"https://{local_ip}:{CONFIG['PORT']}"
-    except Exception:
-        # Fallback to hostname
-        return f"https://{hostname}.local:{CONFIG['PORT']}"
+    return f"https://{hostname}.local:{CONFIG['PORT']}"
+
+
+_FILENAME_STRIP_RE = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def _secure_filename(filename):
+    """
+    Sanitize an uploaded filename; same result as werkzeug's secure_filename.
+
+    Pure-ASCII names (the common case) skip the unicode normalization and
+    re-encoding round trip, which are no-ops for them.
+    """
+    if os.name == "nt" or not filename.isascii():
+        return secure_filename(filename)
+    for sep in os.sep, os.path.altsep:
+        if sep:
+            filename = filename.replace(sep, " ")
+    return _FILENAME_STRIP_RE.sub("", "_".join(filename.split())).strip("._")
+
+
+_UPLOAD_COPY_BUFSIZE = 1 << 20
+
+
+def _save_upload(file, target_path):
+    """
+    Write an uploaded file to disk.
+
+    werkzeug buffers uploads in a SpooledTemporaryFile that only rolls over
+    to a real temporary file past 500 KB; those are copied kernel-side with
+    sendfile(2). Uploads still in memory (fileno() would force them onto
+    disk first), and platforms without file-to-file sendfile, fall back to a
+    1 MiB buffered copy.
+
+    Args:
+        file: werkzeug FileStorage from request.files
+        target_path: Destination path
+    """
+    src = file.stream
+    with open(target_path, "wb") as dst:
+        # fileno() on an unrolled spool calls rollover(), writing it to disk first.
+        # SpooledTemporaryFile has no public "rolled" flag; it holds a BytesIO in
+        # _file until rollover (pinned by TestUploadSave), and plain BytesIO
+        # streams have no descriptor at all.
+        if not isinstance(getattr(src, "_file", src), io.BytesIO):
+            try:
+                in_fd = src.fileno()
+                size = os.fstat(in_fd).st_size
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(dst.fileno(), in_fd, offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+                return
+            except (AttributeError, OSError):
+                # No real file descriptor (BytesIO) or sendfile unsupported
+                dst.seek(0)
+                dst.truncate()
+        src.seek(0)
+        shutil.copyfileobj(src, dst, _UPLOAD_COPY_BUFSIZE)
+
+
+# Upload directories already created by this process, so repeat uploads skip
+# makedirs. Cleared whenever a directory may have been removed or renamed.
+_known_upload_dirs = set()
+
+
+def _ensure_upload_dir(dir_path):
+    """Create an upload target directory unless this process already has."""
+    if dir_path not in _known_upload_dirs:
+        os.makedirs(dir_path, exist_ok=True)
+        _known_upload_dirs.add(dir_path)
 
 
 def _list_directory(base_path, path=""):
@@ -129,48 +283,53 @@ def _list_directory(base_path, path=""):
     if not full_path.startswith(os.path.realpath(base_path)):
         return []
 
-    if not os.path.exists(full_path):
-        return []
-
     items = []
 
     try:
-        dir_entries = os.listdir(full_path)
+        dir_entries = os.scandir(full_path)
+    except FileNotFoundError:
+        return []
     except (PermissionError, OSError) as e:
         print(f"Error listing directory {full_path}: {e}")
         return []
 
-    for item in dir_entries:
-        # Skip hidden files and macOS metadata files
-        if item.startswith(".") or item.startswith("._"):
-            continue
+    # Joined once here; per entry the relative path is a plain concatenation
+    rel_prefix = os.path.join(path, "") if path else ""
+    parent_path = "/" + path if path else "/"
+
+    # scandir hands back names and types from one getdents call; a single
+    # stat() per entry (following symlinks) supplies size, mtime and kind.
+    with dir_entries:
+        for entry in dir_entries:
+            item = entry.name
+            # Skip hidden files and macOS metadata files
+            if item.startswith(".") or item.startswith("._"):
+                continue
 
-        item_path = os.path.join(full_path, item)
-        rel_path = os.path.join(path, item) if path else item
+            rel_path = rel_prefix + item
 
-        try:
-            # Skip broken symlinks
-            if os.path.islink(item_path) and not os.path.exists(item_path):
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                # Broken symlink
+                continue
+            except (PermissionError, OSError) as e:
+                # Skip files we can't access
+                print(f"Skipping {item}: {e}")
                 continue
 
-            stat = os.stat(item_path)
-            is_directory = os.path.isdir(item_path)
-
+            is_directory = stat.S_ISDIR(st.st_mode)
             items.append(
                 {
                     "id": rel_path,  # Use path as unique ID
                     "name": item,
                     "path": rel_path,
                     "type": "folder" if is_directory else "file",
-                    "size": stat.st_size if not is_directory else 0,
-                    "modifiedAt": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                    "parentPath": "/" + path if path else "/",
+                    "size": st.st_size if not is_directory else 0,
+                    "modifiedAt": datetime.fromtimestamp(st.st_mtime).isoformat(),
+                    "parentPath": parent_path,
                 }
             )
-        except (PermissionError, OSError, FileNotFoundError) as e:
-            # Skip files we can't access
-            print(f"Skipping {item}: {e}")
-            continue
 
     return items
 
@@ -194,12 +353,43 @@ def get_file_list(path=""):
     # Ensure directory exists
     os.makedirs(files_base, exist_ok=True)
 
-    items = _list_directory(files_base, path)
+    return _cached_listing(files_base, path)
+
+
+LISTING_CACHE_TTL_SECONDS = 5
 
-    # Sort: directories first, then files alphabetically
+
+def _cached_listing(base_path, path=""):
+    """
+    Return the sorted listing of a directory, served from memory when unchanged.
+
+    Entries are keyed on the directory's mtime, so adding, removing or
+    renaming an entry is picked up immediately; in-place changes to a file
+    (size, mtime) are picked up within LISTING_CACHE_TTL_SECONDS.
+
+    The returned list is new, but the item dicts are shared with the cache
+    and must not be mutated.
+    """
+    try:
+        dir_mtime_ns = os.stat(os.path.join(base_path, path)).st_mtime_ns
+    except OSError:
+        return []
+    ttl_bucket = int(time.monotonic()) // LISTING_CACHE_TTL_SECONDS
+    return list(_sorted_listing(base_path, path, dir_mtime_ns, ttl_bucket))
+
+
+@functools.lru_cache(maxsize=256)
+def _sorted_listing(base_path, path, dir_mtime_ns, ttl_bucket):
+    """List a directory with folders first, then files alphabetically."""
+    items = _list_directory(base_path, path)
     items.sort(key=lambda x: (x["type"] != "folder", x["name"].lower()))
+    return tuple(items)
 
-    return items
+
+def _invalidate_listings():
+    """Drop cached listings and stats after a write, delete, rename or move."""
+    _sorted_listing.cache_clear()
+    _cached_stat.cache_clear()
 
 
 def resolve_file_path(rel_path):
@@ -241,10 +431,14 @@ def api_login():
     if not email or not password:
         return jsonify({"error": "Email and password required", "code": "MISSING_CREDENTIALS"}), 400
 
+    if auth.login_throttled(email, request.remote_addr):
+        return jsonify({"error": "Too many failed login attempts", "code": "LOGIN_THROTTLED"}), 429
+
     # Authenticate user
     user = auth.authenticate_user(email, password)
 
     if not user:
+        auth.record_login_failure(email, request.remote_addr)
         log_audit(
             "auth.login_failed",
             target_type="user",
@@ -254,11 +448,9 @@ def api_login():
         )
         return jsonify({"error": "Invalid credentials", "code": "INVALID_CREDENTIALS"}), 401
 
-    # Update last login
-    user.last_login = datetime.utcnow()
-    db.session.commit()
+    auth.reset_login_failures(email, request.remote_addr)
 
-    # Generate JWT token
+    # Generate JWT token (authenticate_user already recorded last_login)
     token = auth.generate_session_token(user)
 
     log_audit(
@@ -566,7 +758,13 @@ def api_list_users():
 
     # Paginate
     total = query.count()
-    users = query.offset((page - 1) * limit).limit(limit).all()
+    # Batch-load what to_dict() reads so the page costs one IN query per relationship, not two per user
+    users = (
+        query.options(selectinload(User.folder_permissions), selectinload(User.groups))
+        .offset((page - 1) * limit)
+        .limit(limit)
+        .all()
+    )
 
     return jsonify(
         {
@@ -1385,6 +1583,22 @@ def user_has_access(user, folder_path, require_write=False):
     return check_access(user, folder_path, require_write=require_write)
 
 
+# First CN attribute of a comma-separated DN, found in one scan without splitting the DN into a list
+_DN_CN_RE = re.compile(r"(?:^|,)\s*CN=([^,]*)", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=256)
+def _client_cert_cn(client_dn):
+    """
+    Return the CN of a subject DN forwarded by nginx, or None.
+
+    Each client sends the same DN with every request, so the parse is
+    memoized per distinct certificate subject.
+    """
+    match = _DN_CN_RE.search(client_dn)
+    return match.group(1).strip() if match else None
+
+
 def _require_mtls_for_protected(user):
     """Return an error response if a non-admin user lacks a valid client cert.
 
@@ -1407,13 +1621,7 @@ def _require_mtls_for_protected(user):
             ), 403
 
         # Verify the cert's CN matches the logged-in user's email
-        client_dn = request.headers.get("X-SSL-Client-S-DN", "")
-        cn_value = None
-        for part in client_dn.split(","):
-            part = part.strip()
-            if part.upper().startswith("CN="):
-                cn_value = part[3:].strip()
-                break
+        cn_value = _client_cert_cn(request.headers.get("X-SSL-Client-S-DN", ""))
         if not cn_value or cn_value.lower() != user.email.lower():
             # Log the mismatch for abuse detection
             _log_cn_mismatch(cn_value, user.id)
@@ -1485,9 +1693,7 @@ def _guest_list_directory(path=""):
     """List files from the guest storage directory."""
     guest_base = os.path.join(CONFIG["STORAGE_PATH"], "files", "guest")
     os.makedirs(guest_base, exist_ok=True)
-    items = _list_directory(guest_base, path)
-    items.sort(key=lambda x: (x["type"] != "folder", x["name"].lower()))
-    return items
+    return _cached_listing(guest_base, path)
 
 
 def _resolve_guest_file_path(rel_path):
@@ -1538,7 +1744,7 @@ def api_guest_download_file():
 
     log_audit("file.guest_download", target_type="file", target_id=path, description=f"Guest downloaded {path}")
 
-    return send_file(str(file_path), as_attachment=True)
+    return _send_stored_file(file_path)
 
 
 @app.route("/api/v1/files", methods=["GET"])
@@ -1631,7 +1837,7 @@ def api_upload_file():
         return jsonify({"error": "No file selected", "code": "NO_FILE"}), 400
 
     # Secure filename and save to the files subdirectory
-    filename = secure_filename(file.filename)
+    filename = _secure_filename(file.filename)
     storage_base = Path(CONFIG["STORAGE_PATH"]).resolve() / "files"
     target_dir = (storage_base / path).resolve()
     # Guard against directory traversal
@@ -1640,10 +1846,11 @@ def api_upload_file():
     target_dir.mkdir(parents=True, exist_ok=True)
     target_path = target_dir / filename
 
-    file.save(str(target_path))
+    _save_upload(file, target_path)
+    _invalidate_listings()
 
     # Return file info
-    stat = target_path.stat()
+    st = target_path.stat()
     file_rel_path = str(Path(path) / filename) if path else filename
 
     log_audit(
@@ -1658,8 +1865,8 @@ def api_upload_file():
             "file": {
                 "name": filename,
                 "path": file_rel_path,
-                "size": stat.st_size,
-                "modifiedAt": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+                "size": st.st_size,
+                "modifiedAt": datetime.fromtimestamp(st.st_mtime).isoformat(),
             }
         }
     ), 201
@@ -1695,15 +1902,13 @@ def api_download_file():
 
     log_audit("file.download", target_type="file", target_id=path, description=f"Downloaded {path}")
 
-    return send_file(str(file_path), as_attachment=True)
+    return _send_stored_file(file_path)
 
 
 @app.route("/api/v1/files/preview", methods=["GET"])
 @auth.require_auth()
 def api_preview_file():
     """Stream file inline for in-browser preview (requires authentication)."""
-    import mimetypes
-
     path = request.args.get("path", "")
     if not path:
         return jsonify({"error": "Path required", "code": "MISSING_PATH"}), 400
@@ -1811,11 +2016,11 @@ def api_delete_file():
 
     try:
         if target_path.is_dir():
-            import shutil
-
             shutil.rmtree(target_path)
+            _known_upload_dirs.clear()
         else:
             target_path.unlink()
+        _invalidate_listings()
 
         log_audit("file.delete", target_type="file", target_id=path, description=f"Deleted {path}")
 
@@ -1871,6 +2076,8 @@ def api_rename_file():
 
     try:
         target_path.rename(new_path)
+        _known_upload_dirs.clear()
+        _invalidate_listings()
         parent_rel = str(Path(path).parent)
         new_rel = (parent_rel + "/" + safe_name).lstrip("/").lstrip(".")
         if new_rel.startswith("/"):
@@ -1941,9 +2148,9 @@ def api_move_file():
         return jsonify({"error": "Cannot move a directory into itself", "code": "INVALID_MOVE"}), 400
 
     try:
-        import shutil
-
         shutil.move(str(source), str(new_location))
+        _known_upload_dirs.clear()
+        _invalidate_listings()
         new_rel = str(Path(dest_dir) / source.name) if dest_dir else source.name
         log_audit(
             "file.move",
@@ -2176,6 +2383,55 @@ def api_get_system_logs():
 # =============================================================================
 
 
+# local-part@domain: no whitespace, a single "@", RFC 5321 length limits
+_EMAIL_RE = re.compile(r"[^@\s]{1,64}@[^@\s]{3,255}")
+
+
+def _validate_registration(email, password, confirm_password):
+    """
+    Validate the email/password fields of the register and first-setup forms.
+
+    Returns:
+        List of error messages (empty when the input is acceptable)
+    """
+    errors = []
+    if not _EMAIL_RE.fullmatch(email):
+        errors.append("Valid email is required")
+    if not password:
+        errors.append("Password is required")
+    elif len(password) < 6:
+        errors.append("Password must be at least 6 characters")
+    if password != confirm_password:
+        errors.append("Passwords do not match")
+    return errors
+
+
+def _redirect(location):
+    """
+    Return a bare 302 to an in-app path.
+
+    flask.redirect also renders an HTML "Redirecting..." body that no
+    browser shows; only the Location header is needed.
+    """
+    return app.response_class(status=302, headers={"Location": iri_to_uri(location)})
+
+
+def _set_auth_cookie(response, name, token, max_age):
+    """
+    Attach a session cookie to a response.
+
+    JWTs only contain URL-safe base64 and dots, so the header is written
+    directly instead of going through werkzeug's generic cookie quoting.
+
+    Args:
+        response: Response to modify
+        name: Cookie name (auth_token or admin_token)
+        token: JWT value
+        max_age: Lifetime in seconds
+    """
+    response.headers.add("Set-Cookie", f"{name}={token}; Secure; HttpOnly; Max-Age={max_age}; Path=/; SameSite=Strict")
+
+
 @app.route("/admin/login", methods=["GET", "POST"])
 def admin_login():
     """Admin login - supports PIN (first-time) or email/password."""
@@ -2195,38 +2451,29 @@ def admin_login():
 
                 if admin_user.is_default_pin:
                     # First-time login - redirect to setup
-                    response = redirect("/admin/first-setup")
+                    response = _redirect("/admin/first-setup")
                 else:
                     # Normal login
-                    response = redirect("/admin")
-
-                response.set_cookie(
-                    "admin_token",
-                    admin_token,
-                    httponly=True,
-                    secure=True,
-                    samesite="Strict",
-                    max_age=2 * 3600,  # 2 hours
-                )
+                    response = _redirect("/admin")
+
+                _set_auth_cookie(response, "admin_token", admin_token, 2 * 3600)  # 2 hours
                 return response
 
         # Try email/password authentication
         if email and password:
+            if auth.login_throttled(email, request.remote_addr):
+                return render_admin_login_page(error="Too many failed attempts, try again later")
             admin_user = auth.authenticate_user(email, password)
-            if admin_user and admin_user.role == "admin":
+            if not admin_user:
+                auth.record_login_failure(email, request.remote_addr)
+            elif admin_user.role == "admin":
+                auth.reset_login_failures(email, request.remote_addr)
                 # Generate session token
                 admin_token = auth.generate_session_token(admin_user)
 
                 # Set cookie and redirect to admin dashboard
-                response = redirect("/admin")
-                response.set_cookie(
-                    "admin_token",
-                    admin_token,
-                    httponly=True,
-                    secure=True,
-                    samesite="Strict",
-                    max_age=2 * 3600,  # 2 hours
-                )
+                response = _redirect("/admin")
+                _set_auth_cookie(response, "admin_token", admin_token, 2 * 3600)  # 2 hours
                 return response
 
         # Invalid credentials
@@ -2245,45 +2492,36 @@ def render_admin_login_page(error=None):
 @auth.require_admin()
 def admin_first_setup():
     """First-time setup for admin - set email and new password."""
-    # Get user from token
-    token = auth.get_admin_token_from_request()
-    admin_user = auth.get_user_from_token(token)
+    admin_user = g.admin_user
 
-    if not admin_user or not admin_user.is_default_pin:
-        # Already set up or invalid token
-        return redirect("/admin")
+    if not admin_user.is_default_pin:
+        # Already set up
+        return _redirect("/admin")
 
     if request.method == "POST":
         email = request.form.get("email", "").strip()
         password = request.form.get("password", "").strip()
         confirm_password = request.form.get("confirm_password", "").strip()
 
-        # Validation
-        errors = []
-        if not email or "@" not in email:
-            errors.append("Valid email is required")
-        if not password:
-            errors.append("Password is required")
-        if password != confirm_password:
-            errors.append("Passwords do not match")
-        if len(password) < 6:
-            errors.append("Password must be at least 6 characters")
-
-        # Check if email is already taken by another user
-        existing_user = User.query.filter_by(email=email).first()
-        if existing_user and existing_user.id != admin_user.id:
-            errors.append("Email already in use")
+        errors = _validate_registration(email, password, confirm_password)
 
         if errors:
             return render_template("first_setup.html", service_name=CONFIG["SERVICE_NAME"], errors=errors, email=email)
 
-        # Update admin user
+        # Update admin user; the unique index on users.email rejects an
+        # address that belongs to another account.
         admin_user.email = email
         admin_user.password_hash = auth.hash_password(password)
         admin_user.is_default_pin = False
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return render_template(
+                "first_setup.html", service_name=CONFIG["SERVICE_NAME"], errors=["Email already in use"], email=email
+            )
 
-        return redirect("/admin")
+        return _redirect("/admin")
 
     # GET request - show setup form
     return render_template("first_setup.html", service_name=CONFIG["SERVICE_NAME"])
@@ -2297,41 +2535,27 @@ def register():
         password = request.form.get("password", "").strip()
         confirm_password = request.form.get("confirm_password", "").strip()
 
-        # Validation
-        errors = []
-        if not email or "@" not in email:
-            errors.append("Valid email is required")
-        if not password:
-            errors.append("Password is required")
-        if password != confirm_password:
-            errors.append("Passwords do not match")
-        if len(password) < 6:
-            errors.append("Password must be at least 6 characters")
-
-        # Check if email already exists
-        existing_user = User.query.filter_by(email=email).first()
-        if existing_user:
-            errors.append("Email already registered")
+        errors = _validate_registration(email, password, confirm_password)
 
         if errors:
             return render_template("register.html", service_name=CONFIG["SERVICE_NAME"], errors=errors, email=email)
 
-        # Create new user
+        # Create new user; a duplicate email is rejected by the unique index
+        # on users.email in the same round-trip as the insert.
         new_user = User(email=email, password_hash=auth.hash_password(password), role="user", is_default_pin=False)
         db.session.add(new_user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return render_template(
+                "register.html", service_name=CONFIG["SERVICE_NAME"], errors=["Email already registered"], email=email
+            )
 
         # Auto-login after registration
         user_token = auth.generate_session_token(new_user)
-        response = redirect("/")
-        response.set_cookie(
-            "auth_token",
-            user_token,
-            httponly=True,
-            secure=True,
-            samesite="Strict",
-            max_age=CONFIG["TOKEN_EXPIRY_HOURS"] * 3600,
-        )
+        response = _redirect("/")
+        _set_auth_cookie(response, "auth_token", user_token, CONFIG["TOKEN_EXPIRY_HOURS"] * 3600)
         return response
 
     # GET request - show registration form
@@ -2345,10 +2569,19 @@ def login():
         email = request.form.get("email", "").strip()
         password = request.form.get("password", "").strip()
 
+        if auth.login_throttled(email, request.remote_addr):
+            return render_template(
+                "login.html",
+                service_name=CONFIG["SERVICE_NAME"],
+                error="Too many failed attempts, try again later",
+                email=email,
+            )
+
         # Authenticate
         user = auth.authenticate_user(email, password)
 
         if not user:
+            auth.record_login_failure(email, request.remote_addr)
             return render_template(
                 "login.html", service_name=CONFIG["SERVICE_NAME"], error="Invalid email or password", email=email
             )
@@ -2362,17 +2595,12 @@ def login():
                 email=email,
             )
 
+        auth.reset_login_failures(email, request.remote_addr)
+
         # Generate session token
         user_token = auth.generate_session_token(user)
-        response = redirect("/")
-        response.set_cookie(
-            "auth_token",
-            user_token,
-            httponly=True,
-            secure=True,
-            samesite="Strict",
-            max_age=CONFIG["TOKEN_EXPIRY_HOURS"] * 3600,
-        )
+        response = _redirect("/")
+        _set_auth_cookie(response, "auth_token", user_token, CONFIG["TOKEN_EXPIRY_HOURS"] * 3600)
         return response
 
     # GET request - show login form
@@ -2382,7 +2610,7 @@ def login():
 @app.route("/logout", methods=["GET", "POST"])
 def logout():
     """Logout user."""
-    response = redirect("/login")
+    response = _redirect("/login")
     response.set_cookie("auth_token", "", expires=0)
     response.set_cookie("admin_token", "", expires=0)
     return response
@@ -2400,53 +2628,42 @@ def authenticate():
         return "Invalid or expired token", 401
 
     # Set secure HttpOnly cookie
-    response = redirect("/")
-    response.set_cookie(
-        "auth_token", token, httponly=True, secure=True, samesite="Strict", max_age=CONFIG["TOKEN_EXPIRY_HOURS"] * 3600
-    )
+    response = _redirect("/")
+    _set_auth_cookie(response, "auth_token", token, CONFIG["TOKEN_EXPIRY_HOURS"] * 3600)
 
     return response
 
 
-@app.route("/admin")
-@auth.require_admin()
-def admin_dashboard():
-    """Admin dashboard - user management and settings."""
-    # TODO: Create new admin dashboard for user management
-    # For now, show simple welcome message
-    token = auth.get_admin_token_from_request()
-    admin_user = auth.get_user_from_token(token)
-
-    return f"""
+_ADMIN_DASHBOARD_TEMPLATE = Template("""
     <!DOCTYPE html>
     <html>
     <head>
-        <title>Admin Dashboard - {CONFIG["SERVICE_NAME"]}</title>
+        <title>Admin Dashboard - $service_name</title>
         <meta name="viewport" content="width=device-width, initial-scale=1">
         <style>
-            body {{
+            body {
                 font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Arial, sans-serif;
                 max-width: 800px;
                 margin: 50px auto;
                 padding: 20px;
                 background: #f5f5f5;
-            }}
-            .container {{
+            }
+            .container {
                 background: white;
                 border-radius: 12px;
                 padding: 40px;
                 box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-            }}
-            h1 {{ color: #333; }}
-            .info {{ margin: 20px 0; color: #666; }}
-            a {{ color: #007bff; text-decoration: none; }}
-            a:hover {{ text-decoration: underline; }}
+            }
+            h1 { color: #333; }
+            .info { margin: 20px 0; color: #666; }
+            a { color: #007bff; text-decoration: none; }
+            a:hover { text-decoration: underline; }
         </style>
     </head>
     <body>
         <div class="container">
             <h1>👨‍💼 Admin Dashboard</h1>
-            <p class="info">Welcome, {admin_user.email if admin_user else "Admin"}!</p>
+            <p class="info">Welcome, $admin_email!</p>
             <p class="info">
                 <a href="/">Browse Files</a> |
                 <a href="/logout">Logout</a>
@@ -2457,7 +2674,21 @@ def admin_dashboard():
         </div>
     </body>
     </html>
-    """
+    """)
+
+
+@app.route("/admin")
+@auth.require_admin()
+def admin_dashboard():
+    """Admin dashboard - user management and settings."""
+    # TODO: Create new admin dashboard for user management
+    # For now, show simple welcome message
+    admin_user = g.admin_user
+
+    return _ADMIN_DASHBOARD_TEMPLATE.substitute(
+        service_name=html.escape(CONFIG["SERVICE_NAME"]),
+        admin_email=html.escape(admin_user.email),
+    )
 
 
 # TODO: Refactor token management for user-specific tokens
@@ -2510,7 +2741,7 @@ def index():
 
     if not token or not auth.validate_token(token):
         # No valid token, redirect to login
-        return redirect("/login")
+        return _redirect("/login")
 
     # Valid token, show file browser (accessible to all authenticated users)
     return render_file_browser()
@@ -2519,32 +2750,138 @@ def index():
 def render_file_browser():
     """Render the file browser interface."""
     path = request.args.get("path", "")
-    files = get_file_list(path)
-
-    # Add formatted size to each file
-    for file in files:
-        file["size_formatted"] = format_size(file["size"])
+    listing = get_file_list(path)
+
+    # Revalidate against the directory mtime and the listed entries, so
+    # unchanged pages are answered with a 304 before anything is rendered.
+    # The entries matter: overwriting a file in place changes its size and
+    # mtime but not the directory's.
+    etag = last_modified = None
+    files_base = os.path.realpath(os.path.join(CONFIG["STORAGE_PATH"], "files"))
+    full_path = os.path.realpath(os.path.join(files_base, path))
+    try:
+        # Same traversal guard as _list_directory; never stat outside the files tree
+        if not full_path.startswith(files_base):
+            raise FileNotFoundError(full_path)
+        dir_stat = os.stat(full_path)
+    except OSError:
+        pass
+    else:
+        total_size = sum(item["size"] for item in listing)
+        newest = max((item["modifiedAt"] for item in listing), default="")
+        etag = f"{dir_stat.st_mtime_ns:x}-{len(listing)}-{total_size:x}-{newest}"
+        last_modified = datetime.fromtimestamp(int(dir_stat.st_mtime), UTC)
+        if newest:
+            # modifiedAt is naive local time; astimezone() reads it as such
+            last_modified = max(last_modified, datetime.fromisoformat(newest).astimezone(UTC).replace(microsecond=0))
+        if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+            response = app.response_class(status=304)
+            response.set_etag(etag, weak=True)
+            response.headers["Cache-Control"] = "private, no-cache"
+            return response
 
     # Get parent path
     parent_path = os.path.dirname(path) if path else ""
 
-    return render_template(
-        "file_browser.html",
-        service_name=CONFIG["SERVICE_NAME"],
-        enable_uploads=CONFIG["ENABLE_UPLOADS"],
-        current_path=path,
-        parent_path=parent_path,
-        files=files,
+    # Stream the page so the head is sent before every row is rendered; sizes
+    # are formatted per row by the format_size filter.
+    response = app.response_class(
+        stream_template(
+            "file_browser.html",
+            service_name=CONFIG["SERVICE_NAME"],
+            enable_uploads=CONFIG["ENABLE_UPLOADS"],
+            current_path=path,
+            parent_path=parent_path,
+            files=listing,
+        ),
+        mimetype="text/html",
     )
+    if etag:
+        response.set_etag(etag, weak=True)
+        response.last_modified = last_modified
+        response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB")
 
 
+@app.template_filter("format_size")
 def format_size(size):
     """Format file size in human-readable format."""
-    for unit in ["B", "KB", "MB", "GB"]:
-        if size < 1024.0:
-            return f"{size:.1f} {unit}"
-        size /= 1024.0
-    return f"{size:.1f} TB"
+    if size < 1024:
+        return f"{size:.1f} B"
+    # Each unit is a factor of 2**10, so the bit length picks the unit directly
+    idx = min((int(size).bit_length() - 1) // 10, len(_SIZE_UNITS) - 1)
+    return f"{size / (1 << (idx * 10)):.1f} {_SIZE_UNITS[idx]}"
+
+
+@functools.lru_cache(maxsize=1024)
+def _cached_stat(path, epoch):
+    """
+    stat() a file, memoized for the current one-second epoch.
+
+    Range requests from resumable downloads hit the same file repeatedly;
+    rotating ``epoch`` bounds staleness to a second. Failed lookups raise and
+    are therefore never cached.
+    """
+    return os.stat(path)
+
+
+def _disposition_filenames(download_name):
+    """
+    Content-Disposition filename parameters, built the way send_file() builds them.
+
+    Non-ASCII names get an ASCII ``filename`` fallback plus an RFC 5987
+    ``filename*``; header values must stay Latin-1 on the wire.
+    """
+    try:
+        download_name.encode("ascii")
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize("NFKD", download_name).encode("ascii", "ignore").decode("ascii")
+        # safe = RFC 5987 attr-char
+        return {"filename": simple, "filename*": "UTF-8''" + quote(download_name, safe="!#$&+-.^_`|~")}
+    return {"filename": download_name}
+
+
+def _x_accel_response(rel_path, download_name):
+    """
+    Build an empty response that tells nginx to serve a stored file itself.
+
+    Args:
+        rel_path: File path relative to STORAGE_PATH
+        download_name: Filename offered to the client
+
+    Returns:
+        Response carrying X-Accel-Redirect and Content-Disposition headers
+    """
+    response = app.response_class()
+    response.headers["X-Accel-Redirect"] = CONFIG["X_ACCEL_PREFIX"] + quote(rel_path.lstrip("/"))
+    response.headers.set("Content-Disposition", "attachment", **_disposition_filenames(download_name))
+    response.headers["Cache-Control"] = "no-cache"
+    # Let nginx pick the type from the file extension
+    del response.headers["Content-Type"]
+    return response
+
+
+def _send_stored_file(file_path):
+    """
+    Send a resolved file under STORAGE_PATH as an attachment.
+
+    With USE_X_ACCEL the body is left to nginx, which also answers Range
+    requests; otherwise conditional=True answers them with 206 partial content.
+
+    Args:
+        file_path: Resolved Path of the file
+    """
+    if CONFIG["USE_X_ACCEL"]:
+        try:
+            rel_path = file_path.relative_to(Path(CONFIG["STORAGE_PATH"]).resolve())
+        except ValueError:
+            pass  # Outside the tree nginx aliases; send it from here
+        else:
+            return _x_accel_response(rel_path.as_posix(), file_path.name)
+    return send_file(str(file_path), as_attachment=True, conditional=True, max_age=0)
 
 
 @app.route("/download/<path:filepath>")
@@ -2553,7 +2890,11 @@ def download_file(filepath):
     """Download a file with chunked streaming for mobile compatibility."""
     full_path = os.path.join(CONFIG["STORAGE_PATH"], filepath)
 
-    if not os.path.exists(full_path) or not os.path.isfile(full_path):
+    try:
+        st = _cached_stat(full_path, int(time.monotonic()))
+    except OSError:
+        st = None
+    if st is None or not stat.S_ISREG(st.st_mode):
         return jsonify({"error": "File not found"}), 404
 
     try:
@@ -2566,6 +2907,9 @@ def download_file(filepath):
             max_age=0,  # No caching for private files
             download_name=os.path.basename(filepath),  # Clean filename
         )
+    except FileNotFoundError:
+        # Removed since the (cached) stat above
+        return jsonify({"error": "File not found"}), 404
     except Exception as e:
         print(f"Error serving file {filepath}: {e}")
         return jsonify({"error": "Error downloading file"}), 500
@@ -2587,14 +2931,69 @@ def upload_file():
     if file.filename == "":
         return jsonify({"error": "No file selected"}), 400
 
-    filename = secure_filename(file.filename)
+    filename = _secure_filename(file.filename)
     full_path = os.path.join(CONFIG["STORAGE_PATH"], path, filename)
 
-    os.makedirs(os.path.dirname(full_path), exist_ok=True)
-    file.save(full_path)
+    parent = os.path.dirname(full_path)
+    _ensure_upload_dir(parent)
+    try:
+        _save_upload(file, full_path)
+    except FileNotFoundError:
+        # Directory removed behind our back; recreate it and retry once
+        _known_upload_dirs.discard(parent)
+        _ensure_upload_dir(parent)
+        _save_upload(file, full_path)
+    _invalidate_listings()
 
     token = auth.get_token_from_request()
-    return redirect(f"/?path={path}&token={token}")
+    return _redirect(f"/?path={path}&token={token}")
+
+
+@app.route("/upload_stream", methods=["PUT"])
+@auth.require_auth("write")
+def upload_stream():
+    """
+    Upload a file sent as the raw request body.
+
+    The body is copied to disk as it arrives, skipping the multipart parser
+    and its temporary file. The filename comes from the percent-encoded
+    X-Filename header and the target directory from the ``path`` query arg.
+    """
+    if not CONFIG["ENABLE_UPLOADS"]:
+        return jsonify({"error": "Uploads disabled"}), 403
+
+    filename = _secure_filename(unquote(request.headers.get("X-Filename", "")))
+    if not filename:
+        return jsonify({"error": "No file selected"}), 400
+
+    path = request.args.get("path", "")
+    storage_base = os.path.realpath(CONFIG["STORAGE_PATH"])
+    parent = os.path.realpath(os.path.join(storage_base, path))
+    # Guard against directory traversal
+    if parent != storage_base and not parent.startswith(storage_base + os.sep):
+        return jsonify({"error": "Invalid path"}), 400
+    full_path = os.path.join(parent, filename)
+
+    _ensure_upload_dir(parent)
+    try:
+        dst = open(full_path, "wb")
+    except FileNotFoundError:
+        # Directory removed behind our back; recreate it and retry once
+        _known_upload_dirs.discard(parent)
+        _ensure_upload_dir(parent)
+        dst = open(full_path, "wb")
+    try:
+        with dst:
+            # request.stream stops at Content-Length and enforces MAX_CONTENT_LENGTH
+            shutil.copyfileobj(request.stream, dst, _UPLOAD_COPY_BUFSIZE)
+    except BaseException:
+        # Don't leave a truncated file behind after a dropped connection
+        with contextlib.suppress(OSError):
+            os.remove(full_path)
+        raise
+    _invalidate_listings()
+
+    return jsonify({"name": filename, "size": os.path.getsize(full_path)}), 201
 
 
 # TODO: Refactor QR code generation for user-specific tokens
@@ -2616,10 +3015,14 @@ def upload_file():
 #     })
 
 
+# Every field is fixed for the life of the process, so encode once
+_HEALTH_BODY = json.dumps({"service": CONFIG["SERVICE_NAME"], "status": "healthy", "version": "2.0"}).encode()
+
+
 @app.route("/health")
 def health():
     """Health check endpoint."""
-    return jsonify({"status": "healthy", "version": "2.0", "service": CONFIG["SERVICE_NAME"]})
+    return app.response_class(_HEALTH_BODY, mimetype="application/json")
 
 
 def create_default_admin(hostname, pin):
@@ -2703,6 +3106,97 @@ def _start_cert_expiry_checker():
     t.start()
 
 
+def _build_ssl_context():
+    """Create the server-side TLS context used by every server backend."""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    # Forward-secret AEAD suites only for TLS 1.2 (TLS 1.3 suites are AEAD already);
+    # AES-GCM is hardware accelerated where available, ChaCha20 covers the rest.
+    context.set_ciphers("ECDHE+AESGCM:ECDHE+CHACHA20")
+    context.options |= ssl.OP_NO_COMPRESSION
+    context.set_alpn_protocols(["http/1.1"])
+    context.load_cert_chain(CONFIG["CERT_PATH"], CONFIG["KEY_PATH"])
+    return context
+
+
+def _serve_gunicorn():
+    """Serve the app with gunicorn's pre-forked gthread or gevent workers from this process."""
+    from gunicorn.app.base import BaseApplication
+
+    worker_class = CONFIG["WSGI_WORKER_CLASS"]
+    if worker_class == "gevent":
+        from gevent import monkey
+
+        # The app is loaded in the master before forking, so patching in the worker is too late
+        if not monkey.is_module_patched("socket"):
+            raise RuntimeError("WSGI_WORKER_CLASS=gevent must be started with: python -m core.gevent_server")
+
+    class _GunicornApp(BaseApplication):
+        def __init__(self, application, options):
+            self.application = application
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # Workers fork from this process, so they share the JWT secret and
+            # guest tokens created during startup.
+            return self.application
+
+    def _post_fork(server, worker):
+        # Pooled connections opened by the master must not be shared across processes
+        with app.app_context():
+            db.engine.dispose(close=False)
+
+    options = {
+        "bind": f"{CONFIG['HOST']}:{CONFIG['PORT']}",
+        "workers": CONFIG["WSGI_WORKERS"],
+        "worker_class": worker_class,
+        "threads": CONFIG["WSGI_THREADS"],
+        "accesslog": "-",
+        "post_fork": _post_fork,
+    }
+    if worker_class == "gevent":
+        options["worker_connections"] = CONFIG["GEVENT_POOL_SIZE"]
+    if CONFIG["SERVE_TLS"]:
+        # gunicorn asks for a context on every accepted connection. Build it once here,
+        # before forking, so the cert chain is loaded once and every worker shares the
+        # same session ticket keys, letting returning clients resume on any worker.
+        ssl_context = _build_ssl_context()
+        options.update(
+            {
+                "certfile": CONFIG["CERT_PATH"],
+                "keyfile": CONFIG["KEY_PATH"],
+                "ssl_context": lambda config, default_ssl_context_factory: ssl_context,
+            }
+        )
+    _GunicornApp(app, options).run()
+
+
+def _serve_gevent():
+    """Serve the app from gevent's WSGIServer, one greenlet per request."""
+    from gevent import monkey
+    from gevent.pool import Pool
+    from gevent.pywsgi import WSGIServer
+
+    if not monkey.is_module_patched("socket"):
+        raise RuntimeError("WSGI_SERVER=gevent must be started with: python -m core.gevent_server")
+
+    ssl_args = {"ssl_context": _build_ssl_context()} if CONFIG["SERVE_TLS"] else {}
+    server = WSGIServer((CONFIG["HOST"], CONFIG["PORT"]), app, spawn=Pool(CONFIG["GEVENT_POOL_SIZE"]), **ssl_args)
+    server.serve_forever()
+
+
+def _create_missing_indexes():
+    """Add indexes declared after a table was first created; create_all() skips existing tables."""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+
 def main():
     """Main server entry point."""
     print("=" * 60)
@@ -2714,16 +3208,32 @@ def main():
         print("ERROR: SSL certificates not found!")
         print("   Certificate path: " + CONFIG["CERT_PATH"])
         print("   Key path: " + CONFIG["KEY_PATH"])
-        print("   Run: python utils/generate_certs.py")
+        print("   Run: python -m utils.generate_certs")
         sys.exit(1)
 
+    # Only the standalone server needs mDNS; importing it here keeps
+    # "from core.server import app" light
+    from utils.mdns_advertiser import MDNSAdvertiser
+
+    # Setup mDNS advertising first: its D-Bus/Zeroconf work runs on its own
+    # thread while the database, CRL and token are prepared below
+    mdns = MDNSAdvertiser(
+        service_name=CONFIG["SERVICE_NAME"],
+        port=CONFIG["PORT"],
+        hostname=CONFIG["MDNS_HOSTNAME"],
+        service_type="_https._tcp",
+    )
+    mdns.start()
+
     # Ensure database directory exists
     db_path = Path(CONFIG["DATABASE_URI"].replace("sqlite:///", ""))
     db_path.parent.mkdir(parents=True, exist_ok=True)
 
     # Initialize database tables
     with app.app_context():
+        _configure_sqlite_engine(db.engine)
         db.create_all()
+        _create_missing_indexes()
 
         print("✅ Database initialized")
 
@@ -2751,27 +3261,18 @@ def main():
         # Create default admin user if no admin exists
         create_default_admin(CONFIG["MDNS_HOSTNAME"], CONFIG["ADMIN_PIN"])
 
+    # Parse the system mime.types now rather than under mimetypes' init lock on the
+    # first preview/download; gunicorn workers fork with the table already loaded
+    mimetypes.init()
+
     # Generate initial access token
     token = auth.generate_guest_token(read_only=not CONFIG["ENABLE_UPLOADS"])
 
     # Start certificate expiry checker background thread
     _start_cert_expiry_checker()
 
-    # Setup mDNS advertising
-    mdns = MDNSAdvertiser(
-        service_name=CONFIG["SERVICE_NAME"],
-        port=CONFIG["PORT"],
-        hostname=CONFIG["MDNS_HOSTNAME"],
-        service_type="_https._tcp",
-    )
-    mdns.advertise()
-    # Setup SSL context
-    ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
-    ssl_context.load_cert_chain(CONFIG["CERT_PATH"], CONFIG["KEY_PATH"])
-
     # Display access information
     server_url = get_server_url()
-    QRGenerator(server_url, token)
 
     print()
     print("✅ Server started successfully!")
@@ -2779,22 +3280,33 @@ def main():
     print(f"📍 Server URL: {server_url}")
     print(f"🔑 Access Token: {token}")
     print()
+    # Gunicorn workers fork from inside the try below and unwind through its
+    # finally on SystemExit; only this process owns the advertisement
+    master_pid = os.getpid()
     # Run server with mobile-friendly settings
     try:
-        run_simple(
-            CONFIG["HOST"],
-            CONFIG["PORT"],
-            app,
-            ssl_context=ssl_context,
-            use_reloader=False,
-            use_debugger=False,
-            threaded=True,  # Handle multiple requests concurrently
-            request_handler=None,  # Use default handler with keep-alive support
-        )
+        if CONFIG["WSGI_SERVER"] == "gunicorn":
+            _serve_gunicorn()
+        elif CONFIG["WSGI_SERVER"] == "gevent":
+            _serve_gevent()
+        else:
+            run_simple(
+                CONFIG["HOST"],
+                CONFIG["PORT"],
+                app,
+                ssl_context=_build_ssl_context() if CONFIG["SERVE_TLS"] else None,
+                use_reloader=False,
+                use_debugger=False,
+                threaded=True,  # Handle multiple requests concurrently
+                request_handler=None,  # Use default handler with keep-alive support
+            )
     except KeyboardInterrupt:
         print("\n\n🛑 Shutting down server...")
-        mdns.stop()
-        print("✅ Server stopped")
+    finally:
+        # Withdraw the mDNS advertisement however the server exits
+        if os.getpid() == master_pid:
+            mdns.stop()
+    print("✅ Server stopped")
 
 
 if __name__ == "__main__":
@@ -133,7 +133,8 @@ class FolderPermission(db.Model):
     # Relationships
     user = db.relationship("User", backref=db.backref("folder_permissions", lazy=True, cascade="all, delete-orphan"))
 
-    # Unique constraint: one permission entry per user per folder
+    # Unique constraint: one permission entry per user per folder. Its index leads
+    # with user_id, so it also serves the per-user permission lookups.
     __table_args__ = (db.UniqueConstraint("user_id", "folder_path", name="unique_user_folder"),)
 
     def __repr__(self):
@@ -291,7 +292,8 @@ class GroupMembership(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     group_id = db.Column(db.Integer, db.ForeignKey("groups.id", ondelete="CASCADE"), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # Indexed on its own: the unique index leads with group_id, so it cannot serve user -> groups lookups
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     __table_args__ = (db.UniqueConstraint("group_id", "user_id", name="unique_group_user"),)
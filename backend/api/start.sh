@@ -42,7 +42,7 @@ fi
 # Verify SSL certificates exist
 if [ ! -f "certs/server_cert.pem" ] || [ ! -f "certs/server_key.pem" ]; then
     echo "Generating SSL certificates..."
-    $PYTHON utils/generate_certs.py 2>&1
+    $PYTHON -m utils.generate_certs 2>&1
     
     if [ ! -f "certs/server_cert.pem" ] || [ ! -f "certs/server_key.pem" ]; then
         echo "ERROR: Could not generate certificates"
@@ -53,15 +53,6 @@ if [ ! -f "certs/server_cert.pem" ] || [ ! -f "certs/server_key.pem" ]; then
     echo ""
 fi
 
-# Ensure CRL file exists and matches current CA so nginx can start
-echo "Verifying CRL matches current CA..."
-$PYTHON -c "
-from utils.generate_certs import generate_empty_crl
-generate_empty_crl('./certs/server_cert.pem', './certs/server_key.pem', './certs/crl.pem')
-"
-echo "   [OK] CRL verified"
-echo ""
-
 # Verify ADMIN_PIN is set
 if [ -z "$ADMIN_PIN" ]; then
     echo "ERROR: ADMIN_PIN environment variable not set"
@@ -78,4 +69,8 @@ echo ""
 # Start the server
 echo "Starting Flask server..."
 echo ""
+if [ "${WSGI_SERVER:-}" = "gevent" ] || [ "${WSGI_WORKER_CLASS:-}" = "gevent" ]; then
+    # gevent has to monkey-patch the stdlib before the server module is imported
+    exec $PYTHON -m core.gevent_server
+fi
 exec $PYTHON -m core.server
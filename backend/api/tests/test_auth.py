@@ -2,6 +2,7 @@
 Unit tests for the TokenAuth class (core/auth.py).
 """
 
+import time
 from datetime import UTC, datetime, timedelta
 
 import jwt
@@ -60,6 +61,27 @@ class TestGenerateAndValidateToken:
     def test_validate_malformed_token(self, auth_instance):
         assert auth_instance.validate_token("not.a.token") is None
 
+    def test_validate_token_reuses_decoded_payload(self, auth_instance, monkeypatch):
+        token = auth_instance.generate_token(user_id="u1")
+        first = auth_instance.validate_token(token)
+
+        def fail_decode(*args, **kwargs):
+            raise AssertionError("signature re-checked for a cached token")
+
+        monkeypatch.setattr(jwt, "decode", fail_decode)
+        assert auth_instance.validate_token(token) == first
+
+    def test_validate_token_cache_respects_expiry(self, auth_instance):
+        payload = {
+            "user_id": "u1",
+            "iat": datetime.now(UTC) - timedelta(hours=1),
+            "exp": datetime.now(UTC) + timedelta(seconds=1),
+        }
+        token = jwt.encode(payload, auth_instance.secret_key, algorithm=auth_instance.algorithm)
+        assert auth_instance.validate_token(token) is not None
+        _, cache_until = auth_instance._validated_tokens[token]
+        assert cache_until <= time.monotonic() + 1
+
 
 class TestGuestTokens:
     def test_generate_guest_token_read_write(self, auth_instance):
@@ -140,3 +162,105 @@ class TestGenerateSessionToken:
         payload = auth.validate_token(token)
         assert payload is not None
         assert payload["role"] == "user"
+
+
+class TestRequireAdmin:
+    def test_admin_user_stashed_on_g(self, app, admin_user, admin_token):
+        from flask import g
+
+        from core.server import auth
+
+        @auth.require_admin()
+        def view():
+            return g.admin_user.email
+
+        with app.test_request_context(headers={"Authorization": f"Bearer {admin_token}"}):
+            assert view() == admin_user.email
+
+    def test_non_admin_rejected(self, app, regular_user, user_token):
+        from core.server import auth
+
+        @auth.require_admin()
+        def view():
+            return "ok"
+
+        with app.test_request_context(headers={"Authorization": f"Bearer {user_token}"}):
+            _, status = view()
+            assert status == 403
+
+
+class TestLoginThrottle:
+    def test_unknown_email_still_checks_a_hash(self, app, auth_instance, monkeypatch):
+        assert auth_instance._dummy_password_hash is not None
+        checked = []
+        monkeypatch.setattr(auth_instance, "hash_password", lambda password: checked.append("hash"))
+        monkeypatch.setattr(auth_instance, "verify_password", lambda password, hashed: checked.append(hashed))
+        with app.app_context():
+            assert auth_instance.authenticate_user("nobody@example.com", "secret") is None
+        # One bcrypt check, same as a wrong password for a known account
+        assert checked == [auth_instance._dummy_password_hash]
+
+    def test_throttled_after_max_failures(self, auth_instance):
+        from core.auth import LOGIN_MAX_FAILURES
+
+        for _ in range(LOGIN_MAX_FAILURES - 1):
+            auth_instance.record_login_failure("a@example.com", "10.0.0.1")
+        assert auth_instance.login_throttled("a@example.com", "10.0.0.1") is False
+        auth_instance.record_login_failure("a@example.com", "10.0.0.1")
+        assert auth_instance.login_throttled("a@example.com", "10.0.0.1") is True
+        assert auth_instance.login_throttled("a@example.com", "10.0.0.2") is False
+
+    def test_reset_clears_failures(self, auth_instance):
+        from core.auth import LOGIN_MAX_FAILURES
+
+        for _ in range(LOGIN_MAX_FAILURES):
+            auth_instance.record_login_failure("a@example.com", "10.0.0.1")
+        auth_instance.reset_login_failures("a@example.com", "10.0.0.1")
+        assert auth_instance.login_throttled("a@example.com", "10.0.0.1") is False
+
+    def test_api_login_returns_429_when_throttled(self, client, regular_user):
+        from core.auth import LOGIN_MAX_FAILURES
+        from core.server import auth
+
+        body = {"email": regular_user.email, "password": "wrong"}
+        try:
+            for _ in range(LOGIN_MAX_FAILURES):
+                assert client.post("/api/v1/auth/login", json=body).status_code == 401
+            resp = client.post("/api/v1/auth/login", json=body)
+            assert resp.status_code == 429
+            assert resp.get_json()["code"] == "LOGIN_THROTTLED"
+        finally:
+            auth._failed_logins.clear()
+
+    def test_throttle_keyed_on_forwarded_client(self, client, regular_user):
+        from core.auth import LOGIN_MAX_FAILURES
+        from core.server import auth
+
+        body = {"email": regular_user.email, "password": "wrong"}
+        attacker = {"X-Forwarded-For": "192.168.1.50"}
+        try:
+            for _ in range(LOGIN_MAX_FAILURES):
+                client.post("/api/v1/auth/login", json=body, headers=attacker)
+            assert client.post("/api/v1/auth/login", json=body, headers=attacker).status_code == 429
+            # Another LAN client behind the same nginx is not locked out
+            other = {"X-Forwarded-For": "192.168.1.51"}
+            assert client.post("/api/v1/auth/login", json=body, headers=other).status_code == 401
+        finally:
+            auth._failed_logins.clear()
+
+    def test_forwarded_for_ignored_from_untrusted_peer(self):
+        from werkzeug.test import EnvironBuilder
+
+        from core.server import _trust_forwarded_for
+
+        seen = []
+
+        def wsgi_app(environ, start_response):
+            seen.append(environ["REMOTE_ADDR"])
+            return []
+
+        middleware = _trust_forwarded_for(wsgi_app, frozenset({"127.0.0.1"}))
+        for peer in ("127.0.0.1", "192.168.1.50"):
+            builder = EnvironBuilder(headers={"X-Forwarded-For": "10.9.9.9"}, environ_base={"REMOTE_ADDR": peer})
+            middleware(builder.get_environ(), None)
+        assert seen == ["10.9.9.9", "192.168.1.50"]
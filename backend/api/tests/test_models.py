@@ -112,3 +112,63 @@ class TestFolderPermissionModel:
 
         remaining = FolderPermission.query.filter_by(folder_path="/videos").all()
         assert remaining == []
+
+
+class TestSqliteConnectionSettings:
+    def test_file_database_uses_wal(self, app, tmp_path):
+        from sqlalchemy import create_engine, text
+        from sqlalchemy.pool import NullPool
+
+        from core.server import _configure_sqlite_engine
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'settings.db'}", poolclass=NullPool)
+        _configure_sqlite_engine(engine)
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            # NORMAL == 1
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+        engine.dispose()
+
+    def test_per_connection_setup_leaves_journal_mode_alone(self, app, tmp_path):
+        import sqlite3
+
+        from core.server import _configure_sqlite_connection
+
+        statements = []
+        conn = sqlite3.connect(tmp_path / "trace.db")
+        conn.set_trace_callback(statements.append)
+        _configure_sqlite_connection(conn, None)
+        conn.close()
+        assert statements == ["PRAGMA synchronous=NORMAL"]
+
+    def test_other_engines_untouched(self, app, tmp_path):
+        from sqlalchemy import create_engine, text
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'other.db'}")
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "delete"
+        engine.dispose()
+
+
+class TestIndexes:
+    def test_group_memberships_indexed_by_user(self, app):
+        from sqlalchemy import inspect
+
+        from models import db
+
+        indexes = inspect(db.engine).get_indexes("group_memberships")
+        assert any(ix["column_names"] == ["user_id"] for ix in indexes)
+
+    def test_missing_indexes_added_to_existing_tables(self, app):
+        from sqlalchemy import inspect, text
+
+        from core.server import _create_missing_indexes
+        from models import db
+
+        db.session.execute(text("DROP INDEX ix_group_memberships_user_id"))
+        db.session.commit()
+
+        _create_missing_indexes()
+
+        names = {ix["name"] for ix in inspect(db.engine).get_indexes("group_memberships")}
+        assert "ix_group_memberships_user_id" in names
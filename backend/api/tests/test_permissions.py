@@ -457,3 +457,36 @@ class TestUserGroupAssignment:
         user_data = resp.get_json()["user"]
         assert len(user_data["groups"]) == 1
         assert user_data["groups"][0]["id"] == group_with_perms.id
+
+
+class TestUserListAPI:
+    """Tests for GET /api/v1/users."""
+
+    def test_permissions_loaded_without_per_user_queries(self, app, client, admin_token):
+        from sqlalchemy import event
+
+        from models import FolderPermission, User, db
+
+        for i in range(5):
+            user = User(email=f"bulk{i}@test.com", password_hash="x", role="user")
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(FolderPermission(user_id=user.id, folder_path=f"/u{i}", can_read="allow"))
+        db.session.commit()
+        db.session.expunge_all()
+
+        statements = []
+
+        def _record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", _record)
+        try:
+            resp = client.get("/api/v1/users", headers={"Authorization": f"Bearer {admin_token}"})
+        finally:
+            event.remove(db.engine, "before_cursor_execute", _record)
+
+        assert resp.status_code == 200
+        users = {u["email"]: u for u in resp.get_json()["users"]}
+        assert users["bulk3@test.com"]["folderPermissions"][0]["path"] == "/u3"
+        assert sum("FROM folder_permissions" in s for s in statements) == 1
@@ -132,3 +132,53 @@ class TestSettingsAllowedDomains:
         data = resp.get_json()
         assert "allowedDomains" in data
         assert isinstance(data["allowedDomains"], list)
+
+
+class TestLegacyRegister:
+    """Test POST /register (server-rendered registration form)."""
+
+    def test_register_creates_user_and_sets_cookie(self, client, app):
+        from models import User
+
+        resp = client.post(
+            "/register",
+            data={"email": "carol@example.com", "password": "secret123", "confirm_password": "secret123"},
+        )
+        assert resp.status_code == 302
+        assert "auth_token=" in resp.headers.get("Set-Cookie", "")
+        assert User.query.filter_by(email="carol@example.com").count() == 1
+
+    def test_register_duplicate_email_rejected(self, client, app, regular_user, monkeypatch):
+        """A duplicate email is caught by the unique index, not a pre-check query."""
+        from core import server as srv
+        from models import User
+
+        monkeypatch.setattr(srv, "render_template", lambda name, **ctx: (ctx.get("errors") or [], 200))
+
+        resp = client.post(
+            "/register",
+            data={"email": regular_user.email, "password": "secret123", "confirm_password": "secret123"},
+        )
+        assert resp.status_code == 200
+        assert resp.get_json() == ["Email already registered"]
+        assert User.query.filter_by(email=regular_user.email).count() == 1
+
+
+class TestRegistrationValidation:
+    def test_valid_input(self):
+        from core.server import _validate_registration
+
+        assert _validate_registration("dave@example.com", "secret123", "secret123") == []
+
+    def test_rejects_malformed_email(self):
+        from core.server import _validate_registration
+
+        for email in ("", "no-at-sign", "two@@example.com", "a b@example.com", "a@b", "@example.com"):
+            assert "Valid email is required" in _validate_registration(email, "secret123", "secret123"), email
+
+    def test_password_errors(self):
+        from core.server import _validate_registration
+
+        assert _validate_registration("dave@example.com", "", "") == ["Password is required"]
+        assert _validate_registration("dave@example.com", "abc", "abc") == ["Password must be at least 6 characters"]
+        assert _validate_registration("dave@example.com", "secret123", "secret124") == ["Passwords do not match"]
@@ -89,6 +89,77 @@ class TestGetFileList:
         result = srv.get_file_list("../../secret.txt")
         assert result == []
 
+    def test_symlinks_followed_and_broken_links_skipped(self, app, monkeypatch, tmp_path):
+        from core import server as srv
+
+        monkeypatch.setitem(srv.CONFIG, "STORAGE_PATH", str(tmp_path))
+        files_dir = tmp_path / "files"
+        files_dir.mkdir()
+        (files_dir / "real").mkdir()
+        (files_dir / "data.bin").write_bytes(b"12345")
+        (files_dir / "linked_dir").symlink_to(files_dir / "real")
+        (files_dir / "linked_file").symlink_to(files_dir / "data.bin")
+        (files_dir / "dangling").symlink_to(files_dir / "missing")
+
+        by_name = {item["name"]: item for item in srv.get_file_list()}
+        assert "dangling" not in by_name
+        assert by_name["linked_dir"]["type"] == "folder"
+        assert by_name["linked_dir"]["size"] == 0
+        assert by_name["linked_file"]["type"] == "file"
+        assert by_name["linked_file"]["size"] == 5
+
+
+class TestListingCache:
+    def test_repeat_listing_served_from_cache(self, app, monkeypatch, tmp_path):
+        from core import server as srv
+
+        monkeypatch.setitem(srv.CONFIG, "STORAGE_PATH", str(tmp_path))
+        (tmp_path / "files").mkdir()
+        (tmp_path / "files" / "a.txt").write_text("a")
+
+        first = srv.get_file_list()
+
+        def fail(*args, **kwargs):
+            raise AssertionError("directory re-scanned")
+
+        monkeypatch.setattr(srv, "_list_directory", fail)
+        assert srv.get_file_list() == first
+
+    def test_new_entry_invalidates_listing(self, app, monkeypatch, tmp_path):
+        import os
+
+        from core import server as srv
+
+        monkeypatch.setitem(srv.CONFIG, "STORAGE_PATH", str(tmp_path))
+        files_dir = tmp_path / "files"
+        files_dir.mkdir()
+        (files_dir / "a.txt").write_text("a")
+        assert [f["name"] for f in srv.get_file_list()] == ["a.txt"]
+
+        (files_dir / "b.txt").write_text("b")
+        # Make sure the directory mtime moves even on coarse-grained filesystems
+        st = os.stat(files_dir)
+        os.utime(files_dir, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        assert [f["name"] for f in srv.get_file_list()] == ["a.txt", "b.txt"]
+
+    def test_overwrite_upload_refreshes_size(self, client, admin_token, monkeypatch, tmp_path):
+        import io
+
+        from core import server as srv
+
+        monkeypatch.setitem(srv.CONFIG, "STORAGE_PATH", str(tmp_path))
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        for payload in (b"1", b"12345"):
+            resp = client.post(
+                "/api/v1/files/upload",
+                data={"file": (io.BytesIO(payload), "same.txt")},
+                headers=headers,
+                content_type="multipart/form-data",
+            )
+            assert resp.status_code == 201
+            listing = client.get("/api/v1/files", headers=headers).get_json()["files"]
+            assert listing[0]["size"] == len(payload)
+
 
 class TestResolveFilePath:
     def test_resolve_finds_file(self, app, monkeypatch, tmp_path):
@@ -228,3 +299,704 @@ class TestAdminEmailUsesHostname:
         result = srv.create_default_admin("newhost", srv.CONFIG["ADMIN_PIN"])
         assert result is None
         assert User.query.filter_by(role="admin").count() == 1
+
+
+class TestAdminDashboard:
+    def test_dashboard_escapes_admin_email(self, client, admin_user, admin_token):
+        from models import db
+
+        admin_user.email = "<b>root</b>@test.com"
+        db.session.commit()
+
+        client.set_cookie("admin_token", admin_token)
+        resp = client.get("/admin")
+        assert resp.status_code == 200
+        body = resp.get_data(as_text=True)
+        assert "Welcome, &lt;b&gt;root&lt;/b&gt;@test.com!" in body
+        assert "body {" in body
+
+
+class TestFormatSize:
+    def test_bytes(self):
+        from core.server import format_size
+
+        assert format_size(0) == "0.0 B"
+        assert format_size(1023) == "1023.0 B"
+
+    def test_unit_boundaries(self):
+        from core.server import format_size
+
+        assert format_size(1024) == "1.0 KB"
+        assert format_size(1536) == "1.5 KB"
+        assert format_size(1024**2) == "1.0 MB"
+        assert format_size(5 * 1024**3) == "5.0 GB"
+        assert format_size(1024**4) == "1.0 TB"
+
+    def test_caps_at_terabytes(self):
+        from core.server import format_size
+
+        assert format_size(2048 * 1024**4) == "2048.0 TB"
+
+
+class TestClientCertCN:
+    def test_cn_extracted_from_dn(self):
+        from core.server import _client_cert_cn
+
+        assert _client_cert_cn("CN=user@example.com,OU=member,O=terracrate") == "user@example.com"
+        assert _client_cert_cn("O=terracrate, OU=member, cn=User@Example.com") == "User@Example.com"
+        assert _client_cert_cn("O=terracrate,OU=member") is None
+        assert _client_cert_cn("") is None
+
+    def test_cn_only_matched_as_whole_attribute(self):
+        from core.server import _client_cert_cn
+
+        assert _client_cert_cn("OU=xCN=evil@example.com,CN=user@example.com") == "user@example.com"
+        assert _client_cert_cn("OU=xCN=evil@example.com") is None
+
+    def test_repeat_dn_parsed_once(self):
+        from core.server import _client_cert_cn
+
+        _client_cert_cn.cache_clear()
+        for _ in range(3):
+            _client_cert_cn("O=terracrate,OU=member,CN=user@example.com")
+        assert _client_cert_cn.cache_info().misses == 1
+
+
+class TestXAccelDownload:
+    def test_legacy_download_not_offloaded(self, client, user_token, monkeypatch, tmp_path):
+        """nginx only proxies /api/, so the legacy route always sends the body itself."""
+        from core import server as srv
+
+        monkeypatch.setitem(srv.CONFIG, "STORAGE_PATH", str(tmp_path))
+        monkeypatch.setitem(srv.CONFIG, "USE_X_ACCEL", True)
+        (tmp_path / "my report.pdf").write_bytes(b"%PDF")
+
+        resp = client.get("/download/my report.pdf", headers={"Authorization": f"Bearer {user_token}"})
+        assert resp.status_code == 200
+        assert "X-Accel-Redirect" not in resp.headers
+        assert resp.data == b"%PDF"
+
+    def test_api_download_offloaded_to_proxy(self, client, admin_token, monkeypatch, tmp_path):
+        from core import server as srv
+
+        monkeypatch.setitem(srv.CONFIG, "STORAGE_PATH", str(tmp_path))
+        monkeypatch.setitem(srv.CONFIG, "USE_X_ACCEL", True)
+        (tmp_path / "files" / "docs").mkdir(parents=True)
+        (tmp_path / "files" / "docs" / "my report.pdf").write_bytes(b"%PDF")
+
+        resp = client.get(
+            "/api/v1/files/download?path=docs/my report.pdf", headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        assert resp.status_code == 200
+        assert resp.headers["X-Accel-Redirect"] == "/_storage/files/docs/my%20report.pdf"
+        assert 'filename="my report.pdf"' in resp.headers["Content-Disposition"]
+        assert resp.data == b""
+
+    def test_offloaded_non_ascii_filename(self, client, admin_token, monkeypatch, tmp_path):
+        from core import server as srv
+
+        monkeypatch.setitem(srv.CONFIG, "STORAGE_PATH", str(tmp_path))
+        monkeypatch.setitem(srv.CONFIG, "USE_X_ACCEL", True)
+        (tmp_path / "files").mkdir()
+        (tmp_path / "files" / "日本 é.txt").write_bytes(b"x")
+
+        resp = client.get("/api/v1/files/download?path=日本 é.txt", headers={"Authorization": f"Bearer {admin_token}"})
+        assert resp.status_code == 200
+        disposition = resp.headers["Content-Disposition"]
+        disposition.encode("latin-1")
+        assert 'filename=" e.txt"' in disposition
+        assert "filename*=UTF-8''%E6%97%A5%E6%9C%AC%20%C3%A9.txt" in disposition
+
+    def test_guest_download_offloaded_to_proxy(self, client, monkeypatch, tmp_path):
+        from core import server as srv
+
+        monkeypatch.setitem(srv.CONFIG, "STORAGE_PATH", str(tmp_path))
+        monkeypatch.setitem(srv.CONFIG, "USE_X_ACCEL", True)
+        (tmp_path / "files" / "guest").mkdir(parents=True)
+        (tmp_path / "files" / "guest" / "a.txt").write_bytes(b"hello")
+
+        resp = client.get("/api/v1/guest/files/download?path=a.txt")
+        assert resp.status_code == 200
+        assert resp.headers["X-Accel-Redirect"] == "/_storage/files/guest/a.txt"
+        assert resp.data == b""
+
+    def test_download_streams_when_disabled(self, client, user_token, monkeypatch, tmp_path):
+        from core import server as srv
+
+        monkeypatch.setitem(srv.CONFIG, "STORAGE_PATH", str(tmp_path))
+        (tmp_path / "a.txt").write_bytes(b"hello")
+
+        resp = client.get("/download/a.txt", headers={"Authorization": f"Bearer {user_token}"})
+        assert resp.status_code == 200
+        assert "X-Accel-Redirect" not in resp.headers
+        assert resp.data == b"hello"
+
+    def test_download_missing_file_404(self, client, user_token, monkeypatch, tmp_path):
+        from core import server as srv
+
+        monkeypatch.setitem(srv.CONFIG, "STORAGE_PATH", str(tmp_path))
+        (tmp_path / "folder").mkdir()
+
+        headers = {"Authorization": f"Bearer {user_token}"}
+        assert client.get("/download/nope.txt", headers=headers).status_code == 404
+        assert client.get("/download/folder", headers=headers).status_code == 404
+
+    def test_download_removed_within_stat_epoch_404(self, client, user_token, monkeypatch, tmp_path):
+        """A stat cached before the file disappeared must not turn into a 500."""
+        from core import server as srv
+
+        monkeypatch.setitem(srv.CONFIG, "STORAGE_PATH", str(tmp_path))
+        monkeypatch.setattr(srv.time, "monotonic", lambda: 42.0)
+        (tmp_path / "a.txt").write_bytes(b"hello")
+
+        headers = {"Authorization": f"Bearer {user_token}"}
+        assert client.get("/download/a.txt", headers=headers).status_code == 200
+        (tmp_path / "a.txt").unlink()
+        assert client.get("/download/a.txt", headers=headers).status_code == 404
+
+    def test_delete_drops_cached_stat(self, client, admin_token, monkeypatch, tmp_path):
+        from core import server as srv
+
+        monkeypatch.setitem(srv.CONFIG, "STORAGE_PATH", str(tmp_path))
+        monkeypatch.setitem(srv.CONFIG, "ENABLE_DELETE", True)
+        (tmp_path / "files").mkdir()
+        (tmp_path / "files" / "a.txt").write_bytes(b"hello")
+
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        assert client.get("/download/files/a.txt", headers=headers).status_code == 200
+        assert srv._cached_stat.cache_info().currsize
+        assert client.delete("/api/v1/files?path=a.txt", headers=headers).status_code == 200
+        assert srv._cached_stat.cache_info().currsize == 0
+
+    def test_x_sendfile_header(self, app, client, user_token, monkeypatch, tmp_path):
+        from core import server as srv
+
+        monkeypatch.setitem(srv.CONFIG, "STORAGE_PATH", str(tmp_path))
+        monkeypatch.setitem(app.config, "USE_X_SENDFILE", True)
+        (tmp_path / "a.txt").write_bytes(b"hello")
+
+        resp = client.get("/download/a.txt", headers={"Authorization": f"Bearer {user_token}"})
+        assert resp.status_code == 200
+        assert resp.headers["X-Sendfile"] == str(tmp_path / "a.txt")
+        assert resp.data == b""
+
+
+class TestApiDownloadRanges:
+    def test_range_request_returns_partial_content(self, client, admin_token, monkeypatch, tmp_path):
+        from core import server as srv
+
+        monkeypatch.setitem(srv.CONFIG, "STORAGE_PATH", str(tmp_path))
+        (tmp_path / "files").mkdir()
+        (tmp_path / "files" / "video.bin").write_bytes(bytes(range(100)))
+
+        resp = client.get(
+            "/api/v1/files/download?path=video.bin",
+            headers={"Authorization": f"Bearer {admin_token}", "Range": "bytes=10-19"},
+        )
+        assert resp.status_code == 206
+        assert resp.headers["Content-Range"] == "bytes 10-19/100"
+        assert resp.data == bytes(range(10, 20))
+
+    def test_guest_range_request(self, client, monkeypatch, tmp_path):
+        from core import server as srv
+
+        monkeypatch.setitem(srv.CONFIG, "STORAGE_PATH", str(tmp_path))
+        (tmp_path / "files" / "guest").mkdir(parents=True)
+        (tmp_path / "files" / "guest" / "doc.txt").write_bytes(b"0123456789")
+
+        resp = client.get("/api/v1/guest/files/download?path=doc.txt", headers={"Range": "bytes=5-"})
+        assert resp.status_code == 206
+        assert resp.data == b"56789"
+
+
+class TestSecureFilename:
+    def test_matches_werkzeug(self):
+        from werkzeug.utils import secure_filename
+
+        from core.server import _secure_filename
+
+        names = [
+            "report.pdf",
+            "my holiday photo.JPG",
+            "../../etc/passwd",
+            "..",
+            ".htaccess",
+            "a/b\\c.txt",
+            "weird;name$(rm).sh",
+            "  spaced   out  .txt",
+            "résumé naïve.docx",
+            "日本語.txt",
+            "",
+        ]
+        for name in names:
+            assert _secure_filename(name) == secure_filename(name), name
+
+
+class TestSSLContext:
+    def test_context_requires_modern_tls(self, monkeypatch, tmp_path):
+        import ssl
+
+        from core import server as srv
+        from utils.generate_certs import generate_self_signed_cert
+
+        cert_path = str(tmp_path / "cert.pem")
+        key_path = str(tmp_path / "key.pem")
+        generate_self_signed_cert(cert_path=cert_path, key_path=key_path, hostname="testhost")
+        monkeypatch.setitem(srv.CONFIG, "CERT_PATH", cert_path)
+        monkeypatch.setitem(srv.CONFIG, "KEY_PATH", key_path)
+
+        context = srv._build_ssl_context()
+        assert context.minimum_version == ssl.TLSVersion.TLSv1_2
+        assert context.options & ssl.OP_NO_COMPRESSION
+        tls12_ciphers = [c["name"] for c in context.get_ciphers() if c["protocol"] == "TLSv1.2"]
+        assert tls12_ciphers
+        assert all(name.startswith("ECDHE-") for name in tls12_ciphers)
+
+
+class TestUploadSave:
+    def _upload(self, client, admin_token, name, payload):
+        import io
+
+        return client.post(
+            "/api/v1/files/upload",
+            data={"file": (io.BytesIO(payload), name), "path": ""},
+            headers={"Authorization": f"Bearer {admin_token}"},
+            content_type="multipart/form-data",
+        )
+
+    def test_small_upload_written(self, client, admin_token, monkeypatch, tmp_path):
+        from core import server as srv
+
+        monkeypatch.setitem(srv.CONFIG, "STORAGE_PATH", str(tmp_path))
+        resp = self._upload(client, admin_token, "small.txt", b"hello world")
+        assert resp.status_code == 201
+        assert (tmp_path / "files" / "small.txt").read_bytes() == b"hello world"
+
+    def test_small_upload_stays_in_memory(self, client, admin_token, monkeypatch, tmp_path):
+        import tempfile
+
+        from core import server as srv
+
+        monkeypatch.setitem(srv.CONFIG, "STORAGE_PATH", str(tmp_path))
+        rollovers = []
+        rollover = tempfile.SpooledTemporaryFile.rollover
+
+        def counting_rollover(self):
+            rollovers.append(self)
+            rollover(self)
+
+        monkeypatch.setattr(tempfile.SpooledTemporaryFile, "rollover", counting_rollover)
+        payload = b"x" * (100 * 1024)
+        resp = self._upload(client, admin_token, "small.bin", payload)
+        assert resp.status_code == 201
+        assert (tmp_path / "files" / "small.bin").read_bytes() == payload
+        assert not rollovers
+
+    def test_spool_buffer_is_bytesio_until_rollover(self):
+        """_save_upload relies on SpooledTemporaryFile keeping a BytesIO in _file."""
+        import io
+        import tempfile
+
+        with tempfile.SpooledTemporaryFile(max_size=10) as spool:
+            spool.write(b"abc")
+            assert isinstance(spool._file, io.BytesIO)
+            spool.write(b"x" * 20)
+            assert not isinstance(spool._file, io.BytesIO)
+
+    def test_spooled_upload_written(self, client, admin_token, monkeypatch, tmp_path):
+        """Uploads large enough to be spooled to a temp file take the sendfile path."""
+        import os
+
+        from core import server as srv
+
+        monkeypatch.setitem(srv.CONFIG, "STORAGE_PATH", str(tmp_path))
+        payload = os.urandom(3 * 1024 * 1024 + 17)
+        resp = self._upload(client, admin_token, "big.bin", payload)
+        assert resp.status_code == 201
+        assert resp.get_json()["file"]["size"] == len(payload)
+        assert (tmp_path / "files" / "big.bin").read_bytes() == payload
+
+
+class TestUploadStream:
+    def test_raw_body_written_to_path(self, client, user_token, monkeypatch, tmp_path):
+        import os
+
+        from core import server as srv
+
+        monkeypatch.setitem(srv.CONFIG, "STORAGE_PATH", str(tmp_path))
+        payload = os.urandom(2 * 1024 * 1024 + 5)
+        resp = client.put(
+            "/upload_stream?path=inbox",
+            data=payload,
+            headers={"Authorization": f"Bearer {user_token}", "X-Filename": "caf%C3%A9%20notes.bin"},
+        )
+        assert resp.status_code == 201
+        assert resp.get_json() == {"name": "cafe_notes.bin", "size": len(payload)}
+        assert (tmp_path / "inbox" / "cafe_notes.bin").read_bytes() == payload
+
+    def test_traversal_rejected(self, client, user_token, monkeypatch, tmp_path):
+        from core import server as srv
+
+        monkeypatch.setitem(srv.CONFIG, "STORAGE_PATH", str(tmp_path / "storage"))
+        resp = client.put(
+            "/upload_stream?path=../outside",
+            data=b"x",
+            headers={"Authorization": f"Bearer {user_token}", "X-Filename": "a.txt"},
+        )
+        assert resp.status_code == 400
+        assert not (tmp_path / "outside").exists()
+
+
+class TestEnsureUploadDir:
+    def test_creates_once_and_remembers(self, tmp_path, monkeypatch):
+        from core import server as srv
+
+        monkeypatch.setattr(srv, "_known_upload_dirs", set())
+        target = str(tmp_path / "a" / "b")
+        srv._ensure_upload_dir(target)
+        assert (tmp_path / "a" / "b").is_dir()
+        assert target in srv._known_upload_dirs
+
+    def test_known_dir_skips_makedirs(self, tmp_path, monkeypatch):
+        from core import server as srv
+
+        target = str(tmp_path / "known")
+        monkeypatch.setattr(srv, "_known_upload_dirs", {target})
+        srv._ensure_upload_dir(target)
+        assert not (tmp_path / "known").exists()
+
+
+class TestHealth:
+    def test_health_payload(self, client):
+        from core import server as srv
+
+        resp = client.get("/health")
+        assert resp.status_code == 200
+        assert resp.mimetype == "application/json"
+        assert resp.get_json() == {"status": "healthy", "version": "2.0", "service": srv.CONFIG["SERVICE_NAME"]}
+
+
+class TestFileBrowserConditional:
+    def _setup(self, monkeypatch, tmp_path):
+        from core import server as srv
+
+        monkeypatch.setitem(srv.CONFIG, "STORAGE_PATH", str(tmp_path))
+        (tmp_path / "files").mkdir()
+        (tmp_path / "files" / "a.txt").write_text("a")
+        rendered = []
+
+        def fake_stream(name, **ctx):
+            rendered.append(ctx)
+            yield ",".join(f["name"] for f in ctx["files"])
+
+        monkeypatch.setattr(srv, "stream_template", fake_stream)
+        return rendered
+
+    def test_unchanged_directory_returns_304(self, client, user_token, monkeypatch, tmp_path):
+        rendered = self._setup(monkeypatch, tmp_path)
+        headers = {"Authorization": f"Bearer {user_token}"}
+
+        first = client.get("/", headers=headers)
+        assert first.status_code == 200
+        assert first.headers["ETag"].startswith('W/"')
+        assert "Last-Modified" in first.headers
+
+        second = client.get("/", headers={**headers, "If-None-Match": first.headers["ETag"]})
+        assert second.status_code == 304
+        assert len(rendered) == 1
+
+    def test_changed_directory_rerenders(self, client, user_token, monkeypatch, tmp_path):
+        import os
+
+        rendered = self._setup(monkeypatch, tmp_path)
+        headers = {"Authorization": f"Bearer {user_token}"}
+
+        etag = client.get("/", headers=headers).headers["ETag"]
+        files_dir = tmp_path / "files"
+        (files_dir / "b.txt").write_text("b")
+        st = os.stat(files_dir)
+        os.utime(files_dir, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+        resp = client.get("/", headers={**headers, "If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.get_data(as_text=True) == "a.txt,b.txt"
+        assert len(rendered) == 2
+
+    def test_overwritten_file_rerenders(self, client, admin_token, monkeypatch, tmp_path):
+        import io
+
+        self._setup(monkeypatch, tmp_path)
+        headers = {"Authorization": f"Bearer {admin_token}"}
+
+        def upload(payload):
+            resp = client.post(
+                "/api/v1/files/upload",
+                data={"file": (io.BytesIO(payload), "same.txt"), "path": ""},
+                headers=headers,
+                content_type="multipart/form-data",
+            )
+            assert resp.status_code == 201
+
+        upload(b"1")
+        etag = client.get("/", headers=headers).headers["ETag"]
+        # Same name and entry count, so the directory mtime alone cannot tell
+        upload(b"12345")
+
+        resp = client.get("/", headers={**headers, "If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.headers["ETag"] != etag
+
+    def test_traversal_path_has_no_validators(self, client, user_token, monkeypatch, tmp_path):
+        self._setup(monkeypatch, tmp_path)
+
+        resp = client.get("/?path=../../..", headers={"Authorization": f"Bearer {user_token}"})
+        assert resp.status_code == 200
+        assert "ETag" not in resp.headers
+        assert "Last-Modified" not in resp.headers
+
+    def test_format_size_filter_registered(self, app):
+        from core import server as srv
+
+        assert app.jinja_env.filters["format_size"] is srv.format_size
+
+
+class TestServerUrl:
+    def test_probe_runs_once(self, monkeypatch):
+        import socket
+
+        from core import server as srv
+
+        probes = []
+
+        class FakeSocket:
+            def __init__(self, *args):
+                probes.append(args)
+
+            def connect(self, addr):
+                pass
+
+            def getsockname(self):
+                return ("192.0.2.10", 5000)
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                pass
+
+        srv.get_server_url.cache_clear()
+        monkeypatch.setattr(socket, "socket", FakeSocket)
+        try:
+            first = srv.get_server_url()
+            assert srv.get_server_url() == first
+            assert first == f"https://192.0.2.10:{srv.CONFIG['PORT']}"
+            assert len(probes) == 1
+        finally:
+            srv.get_server_url.cache_clear()
+
+
+class TestLanIPv4:
+    def test_probe_failure_returns_none(self, monkeypatch):
+        import socket
+
+        from utils.net import lan_ipv4
+
+        class UnroutableSocket:
+            def __init__(self, *args):
+                pass
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                pass
+
+            def connect(self, addr):
+                raise OSError("Network is unreachable")
+
+        monkeypatch.setattr(socket, "socket", UnroutableSocket)
+        assert lan_ipv4() is None
+
+    def test_callers_share_the_probe(self, monkeypatch):
+        from core import server as srv
+        from utils import generate_certs, mdns_advertiser
+
+        monkeypatch.setattr(srv, "lan_ipv4", lambda: "192.0.2.7")
+        monkeypatch.setattr(generate_certs, "lan_ipv4", lambda: "192.0.2.7")
+        monkeypatch.setattr(mdns_advertiser, "lan_ipv4", lambda: "192.0.2.7")
+        srv.get_server_url.cache_clear()
+        generate_certs._local_ipv4.cache_clear()
+        try:
+            assert srv.get_server_url() == f"https://192.0.2.7:{srv.CONFIG['PORT']}"
+            assert generate_certs._local_ipv4() == "192.0.2.7"
+            assert mdns_advertiser.MDNSAdvertiser(hostname="crate").local_ip == "192.0.2.7"
+        finally:
+            srv.get_server_url.cache_clear()
+            generate_certs._local_ipv4.cache_clear()
+
+
+class TestQRGenerator:
+    def test_base64_cached_until_token_changes(self, monkeypatch):
+        from utils.qr_generator import QRGenerator
+
+        gen = QRGenerator("https://terracrate.local:8443/", "tok1")
+        calls = []
+        original = gen.generate_qr_code
+
+        def counting(path=""):
+            calls.append(path)
+            return original(path)
+
+        monkeypatch.setattr(gen, "generate_qr_code", counting)
+
+        first = gen.generate_qr_base64()
+        assert first.startswith("data:image/png;base64,")
+        assert gen.generate_qr_base64() == first
+        assert len(calls) == 1
+
+        gen.set_token("tok2")
+        assert gen.generate_access_url().endswith("token=tok2")
+        assert gen.generate_qr_base64() != first
+        assert len(calls) == 2
+
+    def test_save_svg(self, tmp_path):
+        from utils.qr_generator import QRGenerator
+
+        target = tmp_path / "access.svg"
+        QRGenerator("https://terracrate.local:8443", "tok").save_qr_code(str(target))
+        assert b"<svg" in target.read_bytes()
+
+    def test_ascii_and_image_share_encoding(self, capsys):
+        from utils.qr_generator import QRGenerator
+
+        gen = QRGenerator("https://terracrate.local:8443", "tok")
+        gen.generate_qr_code()
+        gen.print_ascii_qr()
+        assert len(gen._qr_cache) == 1
+        assert capsys.readouterr().out
+        # Output-specific copies leave the cached encoding's sizing alone
+        assert gen._build_qr("", box_size=1, border=2).box_size == 1
+        assert gen._build_qr("", box_size=10, border=4).border == 4
+
+
+class TestMDNSAdvertiser:
+    def test_add_service_joins_primary(self):
+        from utils.mdns_advertiser import MDNSAdvertiser
+
+        adv = MDNSAdvertiser(service_name="Share", port=8443, service_type="_https._tcp", hostname="crate")
+        adv.add_service("Share SMB", "_smb._tcp", 445)
+        assert adv.services == [("Share", "_https._tcp", 8443), ("Share SMB", "_smb._tcp", 445)]
+
+    def test_start_advertises_off_thread_until_stopped(self, monkeypatch):
+        import threading
+
+        from utils.mdns_advertiser import MDNSAdvertiser
+
+        adv = MDNSAdvertiser(hostname="crate")
+        events = []
+        advertised = threading.Event()
+
+        def fake_advertise():
+            events.append(("advertise", threading.current_thread() is threading.main_thread()))
+            advertised.set()
+
+        monkeypatch.setattr(adv, "advertise", fake_advertise)
+        monkeypatch.setattr(adv, "_withdraw", lambda: events.append(("withdraw", None)))
+
+        adv.start()
+        assert advertised.wait(timeout=5)
+        adv.stop()
+
+        assert events == [("advertise", False), ("withdraw", None)]
+
+    def test_gevent_advertises_on_native_threadpool(self, monkeypatch):
+        import _thread
+
+        from gevent.threadpool import ThreadPool
+
+        from utils import mdns_advertiser
+
+        pool = ThreadPool(1)
+        monkeypatch.setattr(mdns_advertiser, "_gevent_threadpool", lambda: pool)
+        adv = mdns_advertiser.MDNSAdvertiser(hostname="crate")
+        caller = _thread.get_ident()
+        events = []
+
+        monkeypatch.setattr(adv, "advertise", lambda: events.append(("advertise", _thread.get_ident() != caller)))
+        monkeypatch.setattr(adv, "_withdraw", lambda: events.append(("withdraw", _thread.get_ident() != caller)))
+        try:
+            adv.start()
+            assert adv._thread is None
+            adv.stop()
+        finally:
+            pool.kill()
+
+        assert events == [("advertise", True), ("withdraw", True)]
+
+    def test_lan_ipv4_filter(self):
+        from utils.mdns_advertiser import _is_lan_ipv4
+
+        assert _is_lan_ipv4("192.168.1.20")
+        assert not _is_lan_ipv4("127.0.0.1")
+        assert not _is_lan_ipv4("169.254.3.4")
+
+    def test_local_ip_resolved_once(self, monkeypatch):
+        import socket
+
+        from utils.mdns_advertiser import MDNSAdvertiser
+
+        lookups = []
+
+        def fake_gethostbyname(name):
+            lookups.append(name)
+            return "192.0.2.5"
+
+        monkeypatch.setattr(socket, "gethostbyname", fake_gethostbyname)
+        adv = MDNSAdvertiser(hostname="crate")
+        first = adv.local_ip
+        assert first
+        assert adv.local_ip is first
+        # The route probe normally answers; the resolver is only a fallback
+        assert len(lookups) <= 1
+
+
+class TestJsonResponses:
+    def test_keys_keep_insertion_order(self, app):
+        from flask import jsonify
+
+        with app.test_request_context():
+            body = jsonify({"b": 1, "a": 2}).get_data(as_text=True)
+        assert body.index('"b"') < body.index('"a"')
+
+
+class TestGunicornBackend:
+    def test_gevent_workers_require_early_patching(self, app, monkeypatch):
+        import pytest
+
+        from core import server as srv
+
+        monkeypatch.setitem(srv.CONFIG, "WSGI_WORKER_CLASS", "gevent")
+        with pytest.raises(RuntimeError, match="core.gevent_server"):
+            srv._serve_gunicorn()
+
+    def test_tls_context_built_once(self, app, monkeypatch):
+        from gunicorn.app.base import BaseApplication
+
+        from core import server as srv
+
+        built = []
+        monkeypatch.setitem(srv.CONFIG, "WSGI_WORKER_CLASS", "gthread")
+        monkeypatch.setitem(srv.CONFIG, "SERVE_TLS", True)
+        monkeypatch.setattr(srv, "_build_ssl_context", lambda: built.append(object()) or built[-1])
+
+        contexts = []
+
+        def fake_run(self):
+            # gthread asks for a context per accepted connection
+            contexts.extend(self.cfg.ssl_context(self.cfg, None) for _ in range(3))
+
+        monkeypatch.setattr(BaseApplication, "run", fake_run)
+        srv._serve_gunicorn()
+
+        assert len(built) == 1
+        assert all(ctx is built[0] for ctx in contexts)
@@ -4,17 +4,47 @@ Self-signed certificate generator for TerraCrate server.
 Generates server certificate and private key for HTTPS.
 """
 
+import functools
 import ipaddress
 import os
 import socket
 from datetime import UTC, datetime, timedelta
+from pathlib import Path
 
 from cryptography import x509
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric import ec
 from cryptography.x509.oid import NameOID
 
+from utils.net import lan_ipv4
+
+
+@functools.lru_cache(maxsize=1)
+def _local_ipv4():
+    """
+    Return this host's LAN IPv4 address, looked up once per process.
+
+    The outbound-route probe answers without DNS; resolving the hostname is
+    only a fallback, as it can stall on a misconfigured /etc/hosts and often
+    yields 127.0.1.1 on Debian.
+    """
+    local_ip = lan_ipv4()
+    if local_ip:
+        return local_ip
+    try:
+        return socket.getaddrinfo(socket.gethostname(), None, socket.AF_INET)[0][4][0]
+    except (OSError, IndexError):
+        return "127.0.0.1"
+
+
+def _open_private(path, flags):
+    """Opener for private-key files: created 0600, so the key is never briefly world-readable."""
+    fd = os.open(path, flags, 0o600)
+    # An existing file keeps its old mode through O_TRUNC
+    os.fchmod(fd, 0o600)
+    return fd
+
 
 def generate_self_signed_cert(
     cert_path="./certs/server_cert.pem", key_path="./certs/server_key.pem", hostname=None, validity_days=365
@@ -38,8 +68,10 @@ def generate_self_signed_cert(
 
     print(f"🔐 Generating self-signed certificate for '{hostname}'...")
 
-    # Generate private key
-    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048, backend=default_backend())
+    # Generate private key. P-256 rather than RSA-2048: keygen needs no prime
+    # search and ECDSA handshakes sign faster. Ed25519 would be faster still,
+    # but browsers do not accept Ed25519 server certificates.
+    private_key = ec.generate_private_key(ec.SECP256R1(), default_backend())
 
     # Certificate subject and issuer (same for self-signed)
     subject = issuer = x509.Name(
@@ -53,21 +85,18 @@ def generate_self_signed_cert(
     )
 
     # Get IP address
-    try:
-        ip_str = socket.gethostbyname(socket.gethostname())
-        ip_addr = ipaddress.ip_address(ip_str)
-    except Exception:
-        ip_addr = ipaddress.ip_address("127.0.0.1")
+    ip_addr = ipaddress.ip_address(_local_ipv4())
 
-    # Build certificate
+    # Build certificate; one clock read so the validity window is exactly validity_days
+    now = datetime.now(UTC)
     cert = (
         x509.CertificateBuilder()
         .subject_name(subject)
         .issuer_name(issuer)
         .public_key(private_key.public_key())
         .serial_number(x509.random_serial_number())
-        .not_valid_before(datetime.now(UTC))
-        .not_valid_after(datetime.now(UTC) + timedelta(days=validity_days))
+        .not_valid_before(now)
+        .not_valid_after(now + timedelta(days=validity_days))
         .add_extension(
             x509.SubjectAlternativeName(
                 [
@@ -87,7 +116,7 @@ def generate_self_signed_cert(
         .add_extension(
             x509.KeyUsage(
                 digital_signature=True,
-                key_encipherment=True,
+                key_encipherment=False,  # Not applicable to EC keys
                 key_cert_sign=True,
                 key_agreement=False,
                 content_commitment=False,
@@ -101,19 +130,17 @@ def generate_self_signed_cert(
         .sign(private_key, hashes.SHA256(), default_backend())
     )
 
-    # Write certificate to file
-    with open(cert_path, "wb") as f:
-        f.write(cert.public_bytes(serialization.Encoding.PEM))
-
-    # Write private key to file
-    with open(key_path, "wb") as f:
-        f.write(
-            private_key.private_bytes(
-                encoding=serialization.Encoding.PEM,
-                format=serialization.PrivateFormat.TraditionalOpenSSL,
-                encryption_algorithm=serialization.NoEncryption(),
-            )
-        )
+    # Serialize once, then write each file in a single call. PKCS8 matches the
+    # client keys; PEM because nginx and ssl.load_cert_chain read the same files.
+    cert_pem = cert.public_bytes(serialization.Encoding.PEM)
+    key_pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+    Path(cert_path).write_bytes(cert_pem)
+    with open(key_path, "wb", opener=_open_private) as f:
+        f.write(key_pem)
 
     print("✅ Certificate generated successfully!")
     print(f"   📄 Certificate: {cert_path}")
@@ -147,8 +174,9 @@ def generate_client_cert(ca_cert_path, ca_key_path, user_email, validity_days=36
     with open(ca_key_path, "rb") as f:
         ca_key = serialization.load_pem_private_key(f.read(), password=None, backend=default_backend())
 
-    # Generate client private key
-    client_key = rsa.generate_private_key(public_exponent=65537, key_size=2048, backend=default_backend())
+    # Generate client private key (P-256 keygen is a single scalar multiply,
+    # unlike the prime search RSA needs, so issuing certs stays fast)
+    client_key = ec.generate_private_key(ec.SECP256R1(), default_backend())
 
     # Build client certificate subject
     subject = x509.Name(
@@ -160,14 +188,15 @@ def generate_client_cert(ca_cert_path, ca_key_path, user_email, validity_days=36
     )
 
     # Build and sign the client certificate
+    now = datetime.now(UTC)
     cert = (
         x509.CertificateBuilder()
         .subject_name(subject)
         .issuer_name(ca_cert.subject)
         .public_key(client_key.public_key())
         .serial_number(x509.random_serial_number())
-        .not_valid_before(datetime.now(UTC))
-        .not_valid_after(datetime.now(UTC) + timedelta(days=validity_days))
+        .not_valid_before(now)
+        .not_valid_after(now + timedelta(days=validity_days))
         .add_extension(
             x509.SubjectAlternativeName([x509.RFC822Name(user_email)]),
             critical=False,
@@ -179,7 +208,7 @@ def generate_client_cert(ca_cert_path, ca_key_path, user_email, validity_days=36
         .add_extension(
             x509.KeyUsage(
                 digital_signature=True,
-                key_encipherment=True,
+                key_encipherment=False,
                 key_cert_sign=False,
                 key_agreement=False,
                 content_commitment=False,
@@ -201,7 +230,7 @@ def generate_client_cert(ca_cert_path, ca_key_path, user_email, validity_days=36
     client_cert_pem = cert.public_bytes(serialization.Encoding.PEM)
     client_key_pem = client_key.private_bytes(
         encoding=serialization.Encoding.PEM,
-        format=serialization.PrivateFormat.TraditionalOpenSSL,
+        format=serialization.PrivateFormat.PKCS8,
         encryption_algorithm=serialization.NoEncryption(),
     )
 
@@ -282,8 +311,9 @@ def generate_crl(ca_cert_path, ca_key_path, revoked_entries):
 
     builder = x509.CertificateRevocationListBuilder()
     builder = builder.issuer_name(ca_cert.subject)
-    builder = builder.last_update(datetime.now(UTC))
-    builder = builder.next_update(datetime.now(UTC) + timedelta(days=7))
+    now = datetime.now(UTC)
+    builder = builder.last_update(now)
+    builder = builder.next_update(now + timedelta(days=7))
 
     for entry in revoked_entries:
         revoked = (
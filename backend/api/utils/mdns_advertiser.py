@@ -2,11 +2,42 @@
 """
 mDNS/Avahi service advertiser for TerraCrate.
 Makes the server discoverable on the local network.
+
+Run standalone from backend/api with: python -m utils.mdns_advertiser
 """
 
+import asyncio
+import ipaddress
 import os
 import platform
 import socket
+import sys
+import threading
+from functools import cached_property
+
+from utils.net import lan_ipv4
+
+# Upper bound on each Avahi D-Bus call, well under the bus's 25s default
+AVAHI_CALL_TIMEOUT_MS = 2000
+
+# How long stop() waits for the advertiser thread to withdraw the services
+STOP_TIMEOUT_SECONDS = 5
+
+
+def _is_lan_ipv4(ip):
+    """True for an IPv4 address other peers can reach (not loopback or link-local)."""
+    address = ipaddress.IPv4Address(ip)
+    return not (address.is_loopback or address.is_link_local)
+
+
+def _gevent_threadpool():
+    """gevent's pool of native threads when threading is monkey-patched, else None."""
+    monkey = sys.modules.get("gevent.monkey")
+    if monkey is None or not monkey.is_module_patched("threading"):
+        return None
+    from gevent import get_hub
+
+    return get_hub().threadpool
 
 
 class MDNSAdvertiser:
@@ -25,9 +56,75 @@ class MDNSAdvertiser:
         self.service_name = service_name
         self.port = port
         self.service_type = service_type
-        self.hostname = hostname or os.environ.get("MDNS_HOSTNAME", socket.gethostname())
+        self._hostname = hostname
+
+        # (name, type, port) of every service to publish; registered together
+        self.services = [(service_name, service_type, port)]
         self.group = None
+        self.bus = None
         self.server = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        # gevent only: pending advertise() on the hub's native threadpool
+        self._pending = None
+
+    @cached_property
+    def hostname(self):
+        """mDNS hostname, resolved on first use so construction makes no syscalls."""
+        if self._hostname:
+            return self._hostname
+        hostname = os.environ.get("MDNS_HOSTNAME")
+        return hostname if hostname is not None else socket.gethostname()
+
+    @cached_property
+    def local_ip(self):
+        """LAN IPv4 address, looked up once; the resolver is only a fallback."""
+        return lan_ipv4() or socket.gethostbyname(socket.gethostname())
+
+    def add_service(self, service_name, service_type, port):
+        """
+        Publish another service alongside the primary one.
+
+        All services share one Avahi entry group (or one Zeroconf instance),
+        so they are committed and probed together. Call before advertise().
+
+        Args:
+            service_name: Human-readable service name
+            service_type: Service type (e.g. _webdav._tcp)
+            port: Service port number
+        """
+        self.services.append((service_name, service_type, port))
+
+    def _print_services(self):
+        """Print the name, type and port of each advertised service."""
+        for service_name, service_type, port in self.services:
+            print(f"   Service: {service_name}")
+            print(f"   Type: {service_type}")
+            print(f"   Port: {port}")
+
+    def start(self):
+        """
+        Advertise from a daemon thread so the caller never blocks on D-Bus or
+        name resolution. The thread holds the registration until stop().
+
+        Under gevent's monkey-patching that thread would be a greenlet, and
+        the blocking D-Bus calls would stall the hub; advertise() runs on
+        gevent's native threadpool instead.
+        """
+        threadpool = _gevent_threadpool()
+        if threadpool is not None:
+            self._pending = threadpool.spawn(self.advertise)
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="mdns-advertiser", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """Advertiser thread body: register, wait for stop(), then withdraw."""
+        self.advertise()
+        self._stop_event.wait()
+        self._withdraw()
 
     def advertise(self):
         """
@@ -47,97 +144,137 @@ class MDNSAdvertiser:
             print(f"   Service available at: https://{self.hostname}:{self.port}")
 
     def _advertise_linux(self):
-        """Advertise service on Linux using Avahi."""
+        """Advertise service on Linux using Avahi over GDBus."""
         try:
-            import dbus
-            from dbus import DBusException
+            from gi.repository import Gio, GLib
 
-            # Get local IP
-            local_ip = socket.gethostbyname(socket.gethostname())
+            local_ip = self.local_ip
 
             # Connect to system bus
-            bus = dbus.SystemBus()
-            server = dbus.Interface(bus.get_object("org.freedesktop.Avahi", "/"), "org.freedesktop.Avahi.Server")
+            bus = Gio.bus_get_sync(Gio.BusType.SYSTEM, None)
+
+            def call(object_path, interface, method, args=None, reply_type=None, name="org.freedesktop.Avahi"):
+                return bus.call_sync(
+                    name,
+                    object_path,
+                    interface,
+                    method,
+                    args,
+                    GLib.VariantType(reply_type) if reply_type else None,
+                    Gio.DBusCallFlags.NO_AUTO_START,
+                    AVAHI_CALL_TIMEOUT_MS,
+                    None,
+                )
+
+            # Calling Avahi when it isn't running waits out the 25s D-Bus
+            # activation timeout; ask the bus whether anyone owns the name first
+            (avahi_running,) = call(
+                "/org/freedesktop/DBus",
+                "org.freedesktop.DBus",
+                "NameHasOwner",
+                GLib.Variant("(s)", ("org.freedesktop.Avahi",)),
+                reply_type="(b)",
+                name="org.freedesktop.DBus",
+            ).unpack()
+            if not avahi_running:
+                print("ℹ️  avahi-daemon not running on the system bus — mDNS handled by host avahi-daemon")
+                print(f"   Service available at: https://{self.hostname}.local:{self.port}")
+                return
 
             # Create entry group
-            group = dbus.Interface(
-                bus.get_object("org.freedesktop.Avahi", server.EntryGroupNew()), "org.freedesktop.Avahi.EntryGroup"
-            )
+            (group,) = call("/", "org.freedesktop.Avahi.Server", "EntryGroupNew", reply_type="(o)").unpack()
 
             # Register hostname -> IP so {hostname}.local resolves on the LAN
             # without requiring the Pi's system hostname to be changed
-            group.AddAddress(
-                -1,  # Interface (-1 = all)
-                0,  # Protocol (0 = IPv4)
-                dbus.UInt32(0),  # Flags
-                f"{self.hostname}.local",
-                local_ip,
-            )
-
-            # Add service
-            group.AddService(
-                -1,  # Interface (-1 = all)
-                -1,  # Protocol (-1 = both IPv4 and IPv6)
-                dbus.UInt32(0),  # Flags
-                self.service_name,
-                self.service_type,
-                "",  # Domain (empty = default)
-                f"{self.hostname}.local",  # Host
-                dbus.UInt16(self.port),
-                [],  # TXT records
+            call(
+                group,
+                "org.freedesktop.Avahi.EntryGroup",
+                "AddAddress",
+                GLib.Variant(
+                    "(iiuss)",
+                    (
+                        -1,  # Interface (-1 = all)
+                        0,  # Protocol (0 = IPv4)
+                        0,  # Flags
+                        f"{self.hostname}.local",
+                        local_ip,
+                    ),
+                ),
             )
 
-            group.Commit()
+            # Add every service to the one group so a single Commit publishes them
+            for service_name, service_type, port in self.services:
+                call(
+                    group,
+                    "org.freedesktop.Avahi.EntryGroup",
+                    "AddService",
+                    GLib.Variant(
+                        "(iiussssqaay)",
+                        (
+                            -1,  # Interface (-1 = all)
+                            -1,  # Protocol (-1 = both IPv4 and IPv6)
+                            0,  # Flags
+                            service_name,
+                            service_type,
+                            "",  # Domain (empty = default)
+                            f"{self.hostname}.local",  # Host
+                            port,
+                            [],  # TXT records
+                        ),
+                    ),
+                )
+
+            call(group, "org.freedesktop.Avahi.EntryGroup", "Commit")
 
             self.group = group
-            self.server = server
+            self.bus = bus
 
             print("✅ mDNS service advertised via Avahi")
-            print(f"   Service: {self.service_name}")
-            print(f"   Type: {self.service_type}")
-            print(f"   Port: {self.port}")
+            self._print_services()
             print(f"   Hostname: {self.hostname}.local ({local_ip})")
 
         except ImportError:
-            print("ℹ️  dbus-python not available — mDNS handled by host avahi-daemon")
+            print("ℹ️  PyGObject not available — mDNS handled by host avahi-daemon")
             print(f"   Ensure hostname is set: sudo hostnamectl set-hostname {self.hostname}")
             print(f"   Service available at: https://{self.hostname}.local:{self.port}")
-        except DBusException as e:
-            print(f"⚠️  Failed to advertise via Avahi D-Bus: {e}")
-            print(f"   Service available at: https://{self.hostname}.local:{self.port}")
         except Exception as e:
-            print(f"⚠️  Unexpected error with Avahi: {e}")
+            # GLib.Error for D-Bus failures; anything else is unexpected
+            print(f"⚠️  Failed to advertise via Avahi D-Bus: {e}")
             print(f"   Service available at: https://{self.hostname}.local:{self.port}")
 
     def _advertise_macos(self):
         """Advertise service on macOS using Bonjour."""
         try:
-            import socket as sock
-
-            from zeroconf import ServiceInfo, Zeroconf
+            from zeroconf import ServiceInfo, Zeroconf, get_all_addresses
 
-            # Get local IP
-            local_ip = sock.gethostbyname(sock.gethostname())
+            # Read addresses straight off the interfaces: resolving our own
+            # hostname can block on DNS and often yields 127.0.0.1 on macOS
+            addresses = [socket.inet_aton(ip) for ip in get_all_addresses() if _is_lan_ipv4(ip)]
+            if not addresses:
+                raise OSError("no routable IPv4 address on any interface")
 
             # Create service info
-            info = ServiceInfo(
-                f"{self.service_type}.local.",
-                f"{self.service_name}.{self.service_type}.local.",
-                port=self.port,
-                addresses=[sock.inet_aton(local_ip)],
-                properties={"path": "/"},
-            )
-
-            # Register service
+            infos = [
+                ServiceInfo(
+                    f"{service_type}.local.",
+                    f"{service_name}.{service_type}.local.",
+                    port=port,
+                    addresses=addresses,
+                    properties={"path": "/"},
+                )
+                for service_name, service_type, port in self.services
+            ]
+
+            # Register services on zeroconf's own event loop thread. Probing and
+            # the spaced announcements take over a second, so don't wait for them.
             zeroconf = Zeroconf()
-            zeroconf.register_service(info)
+            registration = asyncio.run_coroutine_threadsafe(self._register_zeroconf(zeroconf, infos), zeroconf.loop)
+            registration.add_done_callback(self._report_zeroconf_registration)
 
             self.server = zeroconf
 
-            print("✅ mDNS service advertised via Bonjour/Zeroconf")
-            print(f"   Service: {self.service_name}")
-            print(f"   Type: {self.service_type}")
-            print(f"   Port: {self.port}")
+            print("✅ mDNS service advertising via Bonjour/Zeroconf")
+            self._print_services()
             print(f"   Hostname: {self.hostname}.local")
 
         except ImportError:
@@ -148,17 +285,56 @@ class MDNSAdvertiser:
             print(f"⚠️  Failed to advertise via Zeroconf: {e}")
             print(f"   Service available at: https://{self.hostname}.local:{self.port}")
 
+    @staticmethod
+    async def _register_zeroconf(zeroconf, infos):
+        """Probe and announce all services concurrently on the Zeroconf loop."""
+        await asyncio.gather(*(zeroconf.async_register_service(info) for info in infos))
+
+    def _report_zeroconf_registration(self, registration):
+        """Report a background Zeroconf registration that failed."""
+        error = registration.exception()
+        if error is not None:
+            print(f"⚠️  Failed to advertise via Zeroconf: {error}")
+            print(f"   Service available at: https://{self.hostname}.local:{self.port}")
+
     def _advertise_windows(self):
         """Advertise service on Windows."""
         print("ℹ️  mDNS on Windows requires Bonjour Print Services or iTunes")
         print(f"   Service should be accessible at: https://{self.hostname}.local:{self.port}")
-        print(f"   Or use IP directly: https://{socket.gethostbyname(self.hostname)}:{self.port}")
+        print(f"   Or use IP directly: https://{self.local_ip}:{self.port}")
 
     def stop(self):
         """Stop advertising the service."""
+        if self._pending is not None:
+            # Withdraw on a native thread too, once registration has finished
+            pending, self._pending = self._pending, None
+            pending.wait(timeout=STOP_TIMEOUT_SECONDS)
+            _gevent_threadpool().apply(self._withdraw)
+            return
+
+        if self._thread is None:
+            self._withdraw()
+            return
+
+        self._stop_event.set()
+        self._thread.join(timeout=STOP_TIMEOUT_SECONDS)
+        self._thread = None
+
+    def _withdraw(self):
+        """Reset the Avahi entry group and close Zeroconf, if either was registered."""
         if self.group:
             try:
-                self.group.Reset()
+                self.bus.call_sync(
+                    "org.freedesktop.Avahi",
+                    self.group,
+                    "org.freedesktop.Avahi.EntryGroup",
+                    "Reset",
+                    None,
+                    None,
+                    0,  # Gio.DBusCallFlags.NONE
+                    AVAHI_CALL_TIMEOUT_MS,
+                    None,
+                )
                 print("✅ mDNS service advertisement stopped")
             except Exception:
                 pass
@@ -175,14 +351,11 @@ if __name__ == "__main__":
     advertiser = MDNSAdvertiser(service_name="TerraCrate File Share", port=445)
 
     try:
-        advertiser.advertise()
+        advertiser.start()
         print("\nPress Ctrl+C to stop advertising...")
 
-        # Keep running
-        import time
-
-        while True:
-            time.sleep(1)
+        # Keep running; the advertiser thread holds the registration
+        threading.Event().wait()
 
     except KeyboardInterrupt:
         print("\n\nStopping...")
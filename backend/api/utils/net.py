@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Network helpers shared by the server, certificate generator and mDNS advertiser.
+"""
+
+import socket
+
+
+def lan_ipv4():
+    """
+    Return the IPv4 address of the interface that routes outbound traffic, or None.
+
+    Asks the kernel's routing table rather than the resolver, so it never
+    blocks on DNS or /etc/hosts. Callers cache the result and pick their own
+    fallback.
+    """
+    try:
+        # Connecting a UDP socket only picks the outbound interface; nothing is sent
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+            probe.connect(("8.8.8.8", 80))
+            return probe.getsockname()[0]
+    except OSError:
+        return None
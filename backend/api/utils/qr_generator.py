@@ -5,10 +5,9 @@ Generates QR codes containing access URLs with embedded tokens.
 """
 
 import base64
+import copy
 from io import BytesIO
 
-import qrcode
-
 
 class QRGenerator:
     """Generate QR codes for server access URLs."""
@@ -24,6 +23,27 @@ class QRGenerator:
         self.base_url = base_url.rstrip("/")
         self.token = token
 
+        # Formatted once per token; every output path encodes this URL
+        self._url = f"{self.base_url}/auth?token={token}"
+
+        # Encoded data URIs by path; only valid for the current token
+        self._base64_cache = {}
+
+        # Encoded QRCode (module matrix built) by access URL
+        self._qr_cache = {}
+
+    def set_token(self, token):
+        """
+        Replace the embedded access token.
+
+        Args:
+            token: New access token
+        """
+        self.token = token
+        self._url = f"{self.base_url}/auth?token={token}"
+        self._base64_cache.clear()
+        self._qr_cache.clear()
+
     def generate_access_url(self, path=""):
         """
         Generate access URL with embedded token.
@@ -36,12 +56,14 @@ class QRGenerator:
             Full URL with token parameter
         """
         # Always use /auth endpoint for initial authentication
-        url = f"{self.base_url}/auth?token={self.token}"
-        return url
+        return self._url
 
-    def generate_qr_code(self, path="", box_size=10, border=4):
+    def _build_qr(self, path, box_size, border):
         """
-        Generate QR code image for access URL.
+        Return a laid-out QRCode for the access URL.
+
+        Fitting the version and Reed-Solomon encoding run once per URL; each
+        call gets a shallow copy sharing the module matrix, sized for output.
 
         Args:
             path: Optional path to specific resource
@@ -49,18 +71,42 @@ class QRGenerator:
             border: Border size in boxes
 
         Returns:
-            PIL Image object
+            qrcode.QRCode with its matrix built
         """
         url = self.generate_access_url(path)
+        encoded = self._qr_cache.get(url)
+        if encoded is None:
+            # Imported on first use; qrcode pulls in Pillow for image output
+            import qrcode
+
+            encoded = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M)
+            encoded.add_data(url)
+            encoded.make(fit=True)
+            self._qr_cache[url] = encoded
+
+        # Rendering only reads the matrix, so copies can share it
+        qr = copy.copy(encoded)
+        qr.box_size = box_size
+        qr.border = border
+        return qr
+
+    def generate_qr_code(self, path="", box_size=10, border=4, image_factory=None):
+        """
+        Generate QR code image for access URL.
 
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=box_size,
-            border=border,
-        )
-        qr.add_data(url)
-        qr.make(fit=True)
+        Args:
+            path: Optional path to specific resource
+            box_size: Size of each QR code box
+            border: Border size in boxes
+            image_factory: qrcode image class (default: PIL image)
+
+        Returns:
+            Image object from the factory (PIL Image by default)
+        """
+        qr = self._build_qr(path, box_size, border)
+
+        if image_factory is not None:
+            return qr.make_image(image_factory=image_factory)
 
         img = qr.make_image(fill_color="black", back_color="white")
         return img
@@ -75,27 +121,38 @@ class QRGenerator:
         Returns:
             Base64-encoded PNG string
         """
+        cached = self._base64_cache.get(path)
+        if cached is not None:
+            return cached
+
         img = self.generate_qr_code(path)
 
         # Convert to PNG bytes
         buffer = BytesIO()
         img.save(buffer, format="PNG")
-        buffer.seek(0)
 
-        # Encode as base64
-        img_base64 = base64.b64encode(buffer.getvalue()).decode()
+        # Encode as base64 straight from the buffer, without a getvalue() copy
+        img_base64 = base64.b64encode(buffer.getbuffer()).decode("ascii")
 
-        return f"data:image/png;base64,{img_base64}"
+        data_uri = f"data:image/png;base64,{img_base64}"
+        self._base64_cache[path] = data_uri
+        return data_uri
 
     def save_qr_code(self, filename, path=""):
         """
         Save QR code to file.
 
         Args:
-            filename: Output filename
+            filename: Output filename (a .svg suffix writes SVG without Pillow)
             path: Optional path to specific resource
         """
-        img = self.generate_qr_code(path)
+        image_factory = None
+        if filename.lower().endswith(".svg"):
+            from qrcode.image.svg import SvgPathImage
+
+            image_factory = SvgPathImage
+
+        img = self.generate_qr_code(path, image_factory=image_factory)
         img.save(filename)
         print(f"✅ QR code saved to {filename}")
 
@@ -106,17 +163,7 @@ class QRGenerator:
         Args:
             path: Optional path to specific resource
         """
-        url = self.generate_access_url(path)
-
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=1,
-            border=2,
-        )
-        qr.add_data(url)
-        qr.make(fit=True)
-
+        qr = self._build_qr(path, box_size=1, border=2)
         qr.print_ascii(invert=True)
 
 
@@ -186,7 +186,11 @@ systemctl unmask hostapd dnsmasq 2>/dev/null || true
 systemctl disable hostapd dnsmasq 2>/dev/null || true
 echo "hostapd and dnsmasq unmasked and disabled from auto-start (wifi-check.sh controls them)"
 
-# Install and enable the TerraCrate docker compose service
+# Install the TerraCrate docker compose and WiFi fallback units, then reload
+# systemd and enable them together rather than once per unit
+ENABLE_UNITS=()
+
+# Install the TerraCrate docker compose service
 TERRACRATE_SVC_SRC="$SCRIPT_DIR/config/terracrate.service"
 TERRACRATE_SVC_DST="/etc/systemd/system/terracrate.service"
 RUN_USER="${SUDO_USER:-pi}"
@@ -195,25 +199,29 @@ if [[ -f "$TERRACRATE_SVC_SRC" ]]; then
     sed -e "s|^User=.*|User=$RUN_USER|" \
         -e "s|^WorkingDirectory=.*|WorkingDirectory=$SCRIPT_DIR|" \
         "$TERRACRATE_SVC_SRC" > "$TERRACRATE_SVC_DST"
-    systemctl daemon-reload
-    systemctl enable terracrate
-    echo "Installed and enabled terracrate.service -> $TERRACRATE_SVC_DST"
+    ENABLE_UNITS+=(terracrate)
+    echo "Installed terracrate.service -> $TERRACRATE_SVC_DST"
 else
     echo "Warning: $TERRACRATE_SVC_SRC not found — skipping terracrate.service install"
 fi
 
-# Install and enable the systemd service
+# Install the WiFi fallback service
 WIFI_SVC_SRC="$SCRIPT_DIR/config/wifi-fallback.service"
 WIFI_SVC_DST="/etc/systemd/system/wifi-fallback.service"
 if [[ -f "$WIFI_SVC_SRC" ]]; then
     cp "$WIFI_SVC_SRC" "$WIFI_SVC_DST"
-    systemctl daemon-reload
-    systemctl enable wifi-fallback
-    echo "Installed and enabled wifi-fallback.service -> $WIFI_SVC_DST"
+    ENABLE_UNITS+=(wifi-fallback)
+    echo "Installed wifi-fallback.service -> $WIFI_SVC_DST"
 else
     echo "Warning: $WIFI_SVC_SRC not found — skipping wifi-fallback.service install"
 fi
 
+if [[ ${#ENABLE_UNITS[@]} -gt 0 ]]; then
+    systemctl daemon-reload
+    systemctl enable "${ENABLE_UNITS[@]}"
+    echo "Enabled: ${ENABLE_UNITS[*]}"
+fi
+
 # ---------------------------------------------------------------------------
 # Done
 # ---------------------------------------------------------------------------